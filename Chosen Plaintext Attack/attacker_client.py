@@ -1,7 +1,11 @@
 # attacker_client.py
+import argparse
 import socket
+from itertools import chain
 from Crypto.PublicKey import RSA
 
+from ciphertext_dictionary import iter_wordlist, search
+
 # --- Configuration ---
 HOST = '127.0.0.1'  # The server's hostname or IP address
 PORT = 8080        # The port used by the server
@@ -14,8 +18,22 @@ POSSIBLE_COMMANDS = [
     b"DEPLOY_ASSETS"
 ]
 
+def offline_attack(public_key_pem, target_ciphertext, wordlists=(), workers=None):
+    """Encrypt the candidates locally instead of asking the oracle; returns the matching plaintext or None."""
+    public_key = RSA.import_key(public_key_pem)
+    candidates = chain(POSSIBLE_COMMANDS, *(iter_wordlist(path) for path in wordlists))
+    print("[*] Encrypting candidates locally with the public key...")
+    return search(candidates, public_key.n, public_key.e, [target_ciphertext], workers).get(target_ciphertext)
+
 def main():
     """Main attacker function."""
+    parser = argparse.ArgumentParser(description="CPA attacker client.")
+    parser.add_argument("--offline", action="store_true",
+                        help="encrypt candidates locally with the public key instead of querying the oracle")
+    parser.add_argument("--wordlist", action="append", default=[], help="extra candidate file for --offline (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --offline")
+    args = parser.parse_args()
+
     print("--- CPA Attacker Client ---")
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         try:
@@ -52,27 +70,33 @@ def main():
             
             found_secret = None
             
-            for command in POSSIBLE_COMMANDS:
-                # This is the "CHOICE" step. We are choosing a plaintext to encrypt.
-                chosen_plaintext = command
-                print(f"[*] Choosing plaintext: '{chosen_plaintext.decode()}' and sending to oracle...")
+            if args.offline:
+                found_secret = offline_attack(public_key_pem, TARGET_CIPHERTEXT, args.wordlist, args.workers)
+                if found_secret:
+                    print(f"\n[+] SUCCESS! Match found!")
+                    print(f"[+] The secret command is: {found_secret.decode()}")
+            else:
+                for command in POSSIBLE_COMMANDS:
+                    # This is the "CHOICE" step. We are choosing a plaintext to encrypt.
+                    chosen_plaintext = command
+                    print(f"[*] Choosing plaintext: '{chosen_plaintext.decode()}' and sending to oracle...")
 
-                # 3. Send the chosen plaintext to the server's encryption oracle
-                s.sendall(chosen_plaintext)
+                    # 3. Send the chosen plaintext to the server's encryption oracle
+                    s.sendall(chosen_plaintext)
                 
-                # 4. Receive the resulting ciphertext from the oracle
-                generated_ciphertext = s.recv(4096)
+                    # 4. Receive the resulting ciphertext from the oracle
+                    generated_ciphertext = s.recv(4096)
                 
-                print(f"    -> Oracle returned ciphertext (Hex): {generated_ciphertext.hex()}")
+                    print(f"    -> Oracle returned ciphertext (Hex): {generated_ciphertext.hex()}")
 
-                # 5. Compare the oracle's output with the target ciphertext
-                if generated_ciphertext == TARGET_CIPHERTEXT:
-                    print(f"\n[+] SUCCESS! Match found!")
-                    print(f"[+] The secret command is: {chosen_plaintext.decode()}")
-                    found_secret = chosen_plaintext
-                    break
-                else:
-                    print("    -> No match. Trying next command.\n")
+                    # 5. Compare the oracle's output with the target ciphertext
+                    if generated_ciphertext == TARGET_CIPHERTEXT:
+                        print(f"\n[+] SUCCESS! Match found!")
+                        print(f"[+] The secret command is: {chosen_plaintext.decode()}")
+                        found_secret = chosen_plaintext
+                        break
+                    else:
+                        print("    -> No match. Trying next command.\n")
 
             if not found_secret:
                 print("\n[-] ATTACK FAILED. No matching command found in the list.")
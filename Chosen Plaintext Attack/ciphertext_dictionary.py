@@ -0,0 +1,189 @@
+# ciphertext_dictionary.py
+"""Offline ciphertext dictionary for textbook RSA.
+
+textbook_rsa_encrypt is deterministic and the attacker already holds
+the public key, so the oracle is not needed at all: encrypting every
+candidate plaintext locally and matching the results against the target
+ciphertext gives the same answer with no round trips.
+
+Candidates are streamed from wordlists (one plaintext per line) in
+chunks to a process pool, so a wordlist of millions of lines never sits
+in memory.  search() only reports matches for a set of targets;
+build_index() keeps a CiphertextIndex (ciphertext fingerprint ->
+plaintext) to answer later targets without encrypting again.  GMP
+integers are used for the exponentiation when gmpy2 is installed.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from Crypto.PublicKey import RSA
+
+# bounded_map lives in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bounded_map import bounded_map
+
+try:
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
+CHUNK_SIZE = 2048                 # Candidates per task sent to a worker
+FINGERPRINT_MASK = (1 << 64) - 1  # The index is keyed by the low 64 bits of the ciphertext
+
+# --- Candidates ---
+
+def iter_wordlist(path):
+    """Plaintext candidates from a file, one per line (line endings stripped, empty lines skipped)."""
+    with open(path, "rb") as f:
+        for line in f:
+            candidate = line.rstrip(b"\r\n")
+            if candidate:
+                yield candidate
+
+def _chunks(candidates, chunk_size):
+    candidates = iter(candidates)
+    while True:
+        chunk = list(islice(candidates, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+# --- Workers ---
+
+_context = None
+
+def _init_worker(n, e, targets):
+    global _context
+    _context = (mpz(n), e, targets)
+
+def _encrypt_chunk(chunk):
+    """(fingerprint, plaintext) for every candidate, or only the target matches when targets are set."""
+    n, e, targets = _context
+    results = []
+    for plaintext in chunk:
+        m = int.from_bytes(plaintext, byteorder='big')
+        if m >= n:
+            continue  # Textbook RSA cannot encrypt it
+        c = int(pow(mpz(m), e, n))
+        if targets is None or c in targets:
+            results.append((c if targets is not None else c & FINGERPRINT_MASK, plaintext))
+    return results
+
+def _run(candidates, n, e, targets, workers, chunk_size):
+    """Yield every chunk's results; at most two chunks per worker are in flight."""
+    tasks = _chunks(candidates, chunk_size)
+    if workers == 1:
+        _init_worker(n, e, targets)
+        yield from map(_encrypt_chunk, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(n, e, targets)) as executor:
+        yield from bounded_map(executor, _encrypt_chunk, tasks, 2 * (workers or os.cpu_count()), ordered=False)
+
+# --- Dictionary ---
+
+def textbook_encrypt(message, n, e):
+    """Same bytes as server.textbook_rsa_encrypt, from the raw (n, e)."""
+    c = int(pow(mpz(int.from_bytes(message, byteorder='big')), e, mpz(n)))
+    return c.to_bytes((n.bit_length() + 7) // 8, byteorder='big')
+
+class CiphertextIndex:
+    """Fingerprint -> plaintext index of locally encrypted candidates for one public key."""
+
+    def __init__(self, n, e):
+        self.n = n
+        self.e = e
+        self._plaintexts = {}
+
+    def add(self, fingerprint, plaintext):
+        self._plaintexts.setdefault(fingerprint, plaintext)
+
+    def lookup(self, ciphertext):
+        """Plaintext of a ciphertext (bytes or int), or None if no candidate encrypts to it."""
+        c = int.from_bytes(ciphertext, byteorder='big') if isinstance(ciphertext, bytes) else ciphertext
+        plaintext = self._plaintexts.get(c & FINGERPRINT_MASK)
+        # A 64-bit fingerprint can collide: confirm by encrypting the one candidate again
+        if plaintext is not None and int.from_bytes(textbook_encrypt(plaintext, self.n, self.e), 'big') == c:
+            return plaintext
+        return None
+
+    def lookup_many(self, ciphertexts):
+        """{ciphertext: plaintext} for every ciphertext that is in the index."""
+        found = {}
+        for ciphertext in ciphertexts:
+            plaintext = self.lookup(ciphertext)
+            if plaintext is not None:
+                found[ciphertext] = plaintext
+        return found
+
+    def __len__(self):
+        return len(self._plaintexts)
+
+def build_index(candidates, n, e, workers=None, chunk_size=CHUNK_SIZE):
+    """Encrypt every candidate (an iterable of bytes) and index it by ciphertext fingerprint.
+
+    workers=1 stays in this process.
+    """
+    index = CiphertextIndex(n, e)
+    for results in _run(candidates, n, e, None, workers, chunk_size):
+        for fingerprint, plaintext in results:
+            index.add(fingerprint, plaintext)
+    return index
+
+def search(candidates, n, e, targets, workers=None, chunk_size=CHUNK_SIZE):
+    """{target ciphertext: plaintext} for the targets (bytes) some candidate encrypts to.
+
+    Nothing is kept but the matches, and the stream stops as soon as
+    every target has been found.
+    """
+    wanted = {int.from_bytes(target, byteorder='big'): target for target in targets}
+    found = {}
+    results = _run(candidates, n, e, frozenset(wanted), workers, chunk_size)
+    for matches in results:
+        for c, plaintext in matches:
+            found.setdefault(wanted[c], plaintext)
+        if len(found) == len(wanted):
+            results.close()
+            break
+    return found
+
+if __name__ == "__main__":
+    from attacker_client import POSSIBLE_COMMANDS  # The client imports this module, so only here
+
+    parser = argparse.ArgumentParser(description="Match textbook-RSA ciphertexts against locally encrypted candidates.")
+    parser.add_argument("--pubkey", help="PEM public key (default: a fresh 2048-bit demo key)")
+    parser.add_argument("--target", action="append", default=[], help="target ciphertext in hex (repeatable)")
+    parser.add_argument("--wordlist", action="append", default=[], help="candidate file, one plaintext per line (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print("--- Offline Ciphertext Dictionary ---")
+    if args.pubkey:
+        with open(args.pubkey, "rb") as f:
+            public_key = RSA.import_key(f.read())
+        targets = [bytes.fromhex(target) for target in args.target]
+    else:
+        # Demo: the server's setup, with the secret drawn from the commands
+        import random
+        public_key = RSA.generate(2048).publickey()
+        secret = random.choice(POSSIBLE_COMMANDS)
+        targets = [textbook_encrypt(secret, public_key.n, public_key.e)] + \
+                  [bytes.fromhex(target) for target in args.target]
+        print(f"[*] Generated a 2048-bit key; secret command (for verification): {secret.decode()}")
+    if not targets:
+        print("[!] No target ciphertext given (--target HEX).")
+        sys.exit(1)
+
+    candidates = chain(POSSIBLE_COMMANDS, *(iter_wordlist(path) for path in args.wordlist))
+    start = time.time()
+    found = search(candidates, public_key.n, public_key.e, targets, args.workers, args.chunk_size)
+    print(f"[*] Searched in {time.time() - start:.2f} s.")
+    for target in targets:
+        if target in found:
+            print(f"[+] {target.hex()[:32]}... = {found[target].decode(errors='replace')}")
+        else:
+            print(f"[-] {target.hex()[:32]}... not in the candidates.")
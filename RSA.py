@@ -1,27 +1,91 @@
 import random
 import base64
+import mmap
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from sympy import isprime, mod_inverse
 
+PublicKey = namedtuple("PublicKey", "n e")
+
+class PrivateKey(namedtuple("PrivateKey", "n e d p q dP dQ qInv")):
+    """RSA private key that keeps the CRT parameters (dP, dQ, qInv) for fast decryption."""
+    __slots__ = ()
+
+    @classmethod
+    def from_primes(cls, p, q, e=65537):
+        n = p * q
+        d = int(mod_inverse(e, (p - 1) * (q - 1)))
+        return cls(n, e, d, p, q, d % (p - 1), d % (q - 1), int(mod_inverse(q, p)))
+
+def _small_primes(limit):
+    """Odd primes below limit (sieve of Eratosthenes)."""
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = bytearray(len(range(i*i, limit, i)))
+    return [i for i in range(3, limit) if sieve[i]]
+
+SMALL_PRIMES = _small_primes(2000)
+SIEVE_WINDOW = 4096  # Odd candidates examined per sieve pass
+
 def generate_large_prime(bits=512):
-    """Generate a large random prime number of specified bit size."""
+    """Generate a large random prime number of exactly `bits` bits.
+
+    The top two bits and the low bit of the random start are forced, so
+    the prime has full length (and a product of two such primes has
+    2*bits bits).  Odd candidates from the start are sieved by the small
+    primes first and only survivors reach isprime().
+    """
+    if bits < 16:
+        raise ValueError("bits must be at least 16")
     while True:
-        num = random.getrandbits(bits)
-        if isprime(num):
-            return num
+        start = random.getrandbits(bits) | (3 << (bits - 2)) | 1
+        # Offsets i where start + 2*i is divisible by a small prime
+        composite = bytearray(SIEVE_WINDOW)
+        for p in SMALL_PRIMES:
+            first = (-start * ((p + 1) // 2)) % p  # (p + 1) // 2 is the inverse of 2 mod p
+            composite[first::p] = b"\x01" * len(range(first, SIEVE_WINDOW, p))
+        for i in range(SIEVE_WINDOW):
+            if composite[i]:
+                continue
+            num = start + 2 * i
+            if num.bit_length() > bits:
+                break
+            if isprime(num):
+                return num
 
-def generate_keys(bits=1024):
-    """Generate RSA public and private keys with large primes."""
-    p = generate_large_prime(bits // 2)
-    q = generate_large_prime(bits // 2)
+def _generate_prime_worker(bits):
+    random.seed()  # Forked workers would otherwise share the parent's random state
+    return generate_large_prime(bits)
+
+def generate_prime_pair(bits, parallel=False):
+    """Generate two distinct primes of `bits` bits, optionally in two processes at once."""
+    while True:
+        if parallel:
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                p, q = executor.map(_generate_prime_worker, [bits, bits])
+        else:
+            p, q = generate_large_prime(bits), generate_large_prime(bits)
+        if p != q:
+            return p, q
 
-    while p == q:
-        q = generate_large_prime(bits // 2)
+def generate_keys(bits=1024, crt=False, parallel=False, pool=None):
+    """Generate RSA public and private keys with large primes.
 
-    n = p * q
-    phi_n = (p - 1) * (q - 1)
+    Returns (e, n, d); with crt=True the third item is a PrivateKey
+    carrying p, q, dP, dQ and qInv instead of the bare exponent.
+    parallel=True searches for p and q in two processes at once; a
+    prime_pool.PrimePool passed as pool supplies ready-made primes instead.
+    """
+    if pool is not None:
+        p, q = pool.take_pair(bits // 2)
+    else:
+        p, q = generate_prime_pair(bits // 2, parallel)
 
     e = 65537  # Common choice for efficiency
-    d = mod_inverse(e, phi_n)  # Compute modular inverse of e
+    key = PrivateKey.from_primes(p, q, e)
+    n, d = key.n, key.d
 
     print("\nGenerated Keys:")
     print(f"Prime number (p): {p}")
@@ -31,68 +95,391 @@ def generate_keys(bits=1024):
     print(f"Public Exponent (e): {e}")
     print(f"Private Exponent (d): {d}")
     print("\nCheck phi(n), e.d=1 mod phi(n)?")
-    return e, n, d
+    return e, n, (key if crt else d)
+
+def private_op(num, d, n):
+    """Compute num^d mod n, using CRT (Garner recombination) when d is a PrivateKey."""
+    if isinstance(d, PrivateKey):
+        m1 = pow(num, d.dP, d.p)
+        m2 = pow(num, d.dQ, d.q)
+        h = (d.qInv * (m1 - m2)) % d.p
+        return m2 + h * d.q
+    return pow(num, d, n)
+
+BLOCK_MAGIC = b"RSB1"  # Marks block-packed ciphertexts
+
+def _block_sizes(n):
+    """Return (cipher block size, plaintext block size) in bytes for modulus n."""
+    cipher_block_size = (n.bit_length() + 7) // 8
+    # One byte less than the modulus, so every packed block is < n
+    return cipher_block_size, cipher_block_size - 1
+
+def _pad_message(data, plain_block_size):
+    """Pad with 0x80 followed by zeros up to a whole number of blocks."""
+    padding_length = plain_block_size - len(data) % plain_block_size
+    return data + b"\x80" + b"\x00" * (padding_length - 1)
+
+def _unpad_message(data):
+    """Strip the 0x80 00..00 padding added by _pad_message."""
+    stripped = data.rstrip(b"\x00")
+    if not stripped.endswith(b"\x80"):
+        raise ValueError("Invalid block padding")
+    return stripped[:-1]
+
+def _encode_cipher(cipher_bytes, output_format):
+    if output_format == "base64":
+        return base64.b64encode(cipher_bytes).decode()
+    return cipher_bytes.hex()
+
+def _decode_cipher(encoded_cipher, input_format):
+    if input_format == "base64":
+        return base64.b64decode(encoded_cipher)
+    return bytes.fromhex(encoded_cipher)
+
+def _is_block_cipher(cipher_bytes, n):
+    """Block ciphertexts are MAGIC + whole blocks, per-character ones are whole blocks only."""
+    cipher_block_size, _ = _block_sizes(n)
+    return (cipher_bytes.startswith(BLOCK_MAGIC)
+            and len(cipher_bytes) % cipher_block_size == len(BLOCK_MAGIC) % cipher_block_size)
 
-def encrypt(plain_text, e, n, output_format="base64"):
-    """Encrypts message and returns Base64 or Hex-encoded cipher."""
+def _encrypt_char(plain_text, e, n):
+    """Legacy format: one modular exponentiation and one cipher block per character."""
+    cipher_block_size, _ = _block_sizes(n)
     numeric_text = [ord(char) for char in plain_text]
     cipher_text = [pow(num, e, n) for num in numeric_text]
-    
-    cipher_bytes = b"".join(num.to_bytes((n.bit_length() + 7) // 8, 'big') for num in cipher_text)
-    
-    if output_format == "base64":
-        encoded_cipher = base64.b64encode(cipher_bytes).decode()
+    return b"".join(num.to_bytes(cipher_block_size, 'big') for num in cipher_text)
+
+def _encrypt_block(plain_text, e, n):
+    """Pack the UTF-8 bytes of the message into blocks as large as the modulus allows."""
+    cipher_block_size, plain_block_size = _block_sizes(n)
+    if plain_block_size < 1:
+        raise ValueError("Modulus too small for block mode")
+    padded = _pad_message(plain_text.encode("utf-8"), plain_block_size)
+    blocks = [pow(int.from_bytes(padded[i:i+plain_block_size], 'big'), e, n).to_bytes(cipher_block_size, 'big')
+              for i in range(0, len(padded), plain_block_size)]
+    return BLOCK_MAGIC + b"".join(blocks)
+
+def encrypt(plain_text, e, n, output_format="base64", mode="block"):
+    """Encrypts message and returns Base64 or Hex-encoded cipher.
+
+    mode="block" packs the UTF-8 bytes into modulus-sized blocks,
+    mode="char" keeps the legacy one-block-per-character format.
+    """
+    if mode == "char":
+        cipher_bytes = _encrypt_char(plain_text, e, n)
+    elif mode == "block":
+        cipher_bytes = _encrypt_block(plain_text, e, n)
     else:
-        encoded_cipher = cipher_bytes.hex()
-    
+        raise ValueError(f"Unknown mode: {mode}")
+
+    encoded_cipher = _encode_cipher(cipher_bytes, output_format)
+
     print(f"\nCipher ({output_format}): {encoded_cipher}")
     return encoded_cipher
 
-def decrypt(encoded_cipher, d, n, input_format="base64"):
-    """Decrypts Base64 or Hex-encoded cipher and returns plaintext."""
-    if input_format == "base64":
-        cipher_bytes = base64.b64decode(encoded_cipher)
-    else:
-        cipher_bytes = bytes.fromhex(encoded_cipher)
+def _split_cipher(cipher_bytes, n, mode):
+    """Resolve the cipher mode and split its body into integer blocks."""
+    if mode == "auto":
+        mode = "block" if _is_block_cipher(cipher_bytes, n) else "char"
+    if mode == "block":
+        cipher_bytes = cipher_bytes[len(BLOCK_MAGIC):]
+    elif mode != "char":
+        raise ValueError(f"Unknown mode: {mode}")
+
+    cipher_block_size, _ = _block_sizes(n)
+    cipher_blocks = [int.from_bytes(cipher_bytes[i:i+cipher_block_size], 'big') for i in range(0, len(cipher_bytes), cipher_block_size)]
+    return mode, cipher_blocks
+
+def _join_plaintext(numeric_text, n, mode):
+    """Turn decrypted block values back into the message text."""
+    if mode == "char":
+        return ''.join(chr(num) for num in numeric_text)
+    _, plain_block_size = _block_sizes(n)
+    padded = b"".join(num.to_bytes(plain_block_size, 'big') for num in numeric_text)
+    return _unpad_message(padded).decode("utf-8")
+
+# Private key shared by the batch decryption workers (set once per process)
+_worker_key = None
+
+def _init_decrypt_worker(d, n):
+    global _worker_key
+    _worker_key = (d, n)
 
-    block_size = (n.bit_length() + 7) // 8
-    cipher_blocks = [int.from_bytes(cipher_bytes[i:i+block_size], 'big') for i in range(0, len(cipher_bytes), block_size)]
+def _decrypt_chunk(cipher_blocks):
+    d, n = _worker_key
+    return [private_op(num, d, n) for num in cipher_blocks]
 
-    numeric_text = [pow(num, d, n) for num in cipher_blocks]
-    decrypted_text = ''.join(chr(num) for num in numeric_text)
+def _private_op_blocks(cipher_blocks, d, n, workers=None, chunk_size=64):
+    """Apply the private key to every block, spreading chunks over a process pool.
+
+    The pool is skipped for workers=1 or when there is at most one chunk.
+    Results are returned in input order.
+    """
+    if workers == 1 or len(cipher_blocks) <= chunk_size:
+        return [private_op(num, d, n) for num in cipher_blocks]
+
+    chunks = [cipher_blocks[i:i+chunk_size] for i in range(0, len(cipher_blocks), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_decrypt_worker, initargs=(d, n)) as executor:
+        return [num for chunk in executor.map(_decrypt_chunk, chunks) for num in chunk]
+
+def decrypt_batch(encoded_ciphers, d, n, input_format="base64", mode="auto", workers=None, chunk_size=64):
+    """Decrypts many ciphers at once and returns their plaintexts in order.
+
+    The blocks of all ciphers are pooled and decrypted in chunks of
+    chunk_size across `workers` processes (default: one per CPU), so the
+    result matches calling decrypt() on each cipher.
+    """
+    parsed = [_split_cipher(_decode_cipher(encoded_cipher, input_format), n, mode) for encoded_cipher in encoded_ciphers]
+    all_blocks = [num for _, cipher_blocks in parsed for num in cipher_blocks]
+    numeric_text = _private_op_blocks(all_blocks, d, n, workers, chunk_size)
+
+    plain_texts = []
+    offset = 0
+    for cipher_mode, cipher_blocks in parsed:
+        plain_texts.append(_join_plaintext(numeric_text[offset:offset+len(cipher_blocks)], n, cipher_mode))
+        offset += len(cipher_blocks)
+    return plain_texts
+
+def decrypt(encoded_cipher, d, n, input_format="base64", mode="auto", workers=1):
+    """Decrypts Base64 or Hex-encoded cipher and returns plaintext.
+
+    d may be a plain private exponent or a PrivateKey (CRT path).
+
+    mode="auto" recognises block-packed ciphertexts by their header and
+    falls back to the legacy per-character format otherwise.
+    Pass workers=None (one per CPU) or a count to decrypt a long cipher
+    in parallel.
+    """
+    cipher_bytes = _decode_cipher(encoded_cipher, input_format)
+    mode, cipher_blocks = _split_cipher(cipher_bytes, n, mode)
+
+    numeric_text = _private_op_blocks(cipher_blocks, d, n, workers)
+    decrypted_text = _join_plaintext(numeric_text, n, mode)
 
     print(f"\nDecrypted Message: {decrypted_text}")
     return decrypted_text
 
+# --- Streaming (constant-memory) encryption of files ---
+
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read from the input per step
+
+def _iter_plain_blocks(chunks, plain_block_size):
+    """Re-cut byte chunks into padded plaintext block integers."""
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        usable = len(buffer) - len(buffer) % plain_block_size
+        for i in range(0, usable, plain_block_size):
+            yield int.from_bytes(buffer[i:i+plain_block_size], 'big')
+        buffer = buffer[usable:]
+    padded = _pad_message(buffer, plain_block_size)
+    for i in range(0, len(padded), plain_block_size):
+        yield int.from_bytes(padded[i:i+plain_block_size], 'big')
+
+def _iter_cipher_blocks(chunks, n):
+    """Check the block-mode header and cut the remaining bytes into cipher block integers."""
+    cipher_block_size, _ = _block_sizes(n)
+    buffer = b""
+    header_seen = False
+    for chunk in chunks:
+        buffer += chunk
+        if not header_seen:
+            if len(buffer) < len(BLOCK_MAGIC):
+                continue
+            if not buffer.startswith(BLOCK_MAGIC):
+                raise ValueError("Input is not a block-mode ciphertext")
+            buffer = buffer[len(BLOCK_MAGIC):]
+            header_seen = True
+        usable = len(buffer) - len(buffer) % cipher_block_size
+        for i in range(0, usable, cipher_block_size):
+            yield int.from_bytes(buffer[i:i+cipher_block_size], 'big')
+        buffer = buffer[usable:]
+    if not header_seen or buffer:
+        raise ValueError("Truncated ciphertext")
+
+def _iter_mmap_cipher_blocks(view, n):
+    """Same as _iter_cipher_blocks, but slices a memoryview (e.g. over an mmap) without copying."""
+    cipher_block_size, _ = _block_sizes(n)
+    if bytes(view[:len(BLOCK_MAGIC)]) != BLOCK_MAGIC:
+        raise ValueError("Input is not a block-mode ciphertext")
+    if (len(view) - len(BLOCK_MAGIC)) % cipher_block_size:
+        raise ValueError("Truncated ciphertext")
+    for i in range(len(BLOCK_MAGIC), len(view), cipher_block_size):
+        yield int.from_bytes(view[i:i+cipher_block_size], 'big')
+
+def _iter_encoded(byte_chunks, output_format):
+    """Encode a byte stream incrementally as binary, base64 or hex."""
+    if output_format == "binary":
+        yield from byte_chunks
+        return
+    if output_format == "hex":
+        for chunk in byte_chunks:
+            yield chunk.hex().encode()
+        return
+    pending = b""  # base64 must be cut on 3-byte boundaries to match one-shot encoding
+    for chunk in byte_chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % 3
+        yield base64.b64encode(pending[:usable])
+        pending = pending[usable:]
+    yield base64.b64encode(pending)
+
+def _iter_decoded(text_chunks, input_format):
+    """Decode a binary, base64 or hex stream incrementally, ignoring whitespace in text formats."""
+    if input_format == "binary":
+        yield from text_chunks
+        return
+    group = 2 if input_format == "hex" else 4
+    pending = b""
+    for chunk in text_chunks:
+        pending += b"".join(chunk.split())
+        usable = len(pending) - len(pending) % group
+        yield bytes.fromhex(pending[:usable].decode()) if group == 2 else base64.b64decode(pending[:usable])
+        pending = pending[usable:]
+    if pending:
+        raise ValueError("Truncated encoded input")
+
+def _read_chunks(stream, chunk_size):
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def _batched(blocks, count):
+    batch = []
+    for block in blocks:
+        batch.append(block)
+        if len(batch) == count:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def encrypt_stream(in_stream, out_stream, e, n, output_format="binary", chunk_size=STREAM_CHUNK_SIZE):
+    """Encrypts a binary stream in block mode without holding it in memory.
+
+    Output is the block-mode ciphertext (header + blocks), written as raw
+    bytes or as base64/hex text identical to what encrypt() produces.
+    """
+    cipher_block_size, plain_block_size = _block_sizes(n)
+    blocks_per_batch = max(1, chunk_size // plain_block_size)
+
+    def cipher_bytes():
+        yield BLOCK_MAGIC
+        for batch in _batched(_iter_plain_blocks(_read_chunks(in_stream, chunk_size), plain_block_size), blocks_per_batch):
+            yield b"".join(pow(num, e, n).to_bytes(cipher_block_size, 'big') for num in batch)
+
+    for data in _iter_encoded(cipher_bytes(), output_format):
+        out_stream.write(data)
+
+def _write_plain_blocks(cipher_blocks, out_stream, d, n, batch_size):
+    """Decrypt block integers and write them out, stripping the padding from the last block."""
+    _, plain_block_size = _block_sizes(n)
+    last = None
+    for batch in _batched(cipher_blocks, batch_size):
+        plain = b"".join(private_op(num, d, n).to_bytes(plain_block_size, 'big') for num in batch)
+        if last is not None:
+            out_stream.write(last)
+        last = plain
+    if last is None:
+        raise ValueError("Empty ciphertext")
+    # Only the final block carries padding
+    out_stream.write(last[:-plain_block_size] + _unpad_message(last[-plain_block_size:]))
+
+def decrypt_stream(in_stream, out_stream, d, n, input_format="binary", chunk_size=STREAM_CHUNK_SIZE):
+    """Decrypts a block-mode ciphertext stream written by encrypt_stream() or encrypt()."""
+    cipher_block_size, _ = _block_sizes(n)
+    chunks = _iter_decoded(_read_chunks(in_stream, chunk_size), input_format)
+    _write_plain_blocks(_iter_cipher_blocks(chunks, n), out_stream, d, n, max(1, chunk_size // cipher_block_size))
+
+def encrypt_file(in_path, out_path, e, n, output_format="binary", chunk_size=STREAM_CHUNK_SIZE):
+    with open(in_path, "rb") as in_stream, open(out_path, "wb") as out_stream:
+        encrypt_stream(in_stream, out_stream, e, n, output_format, chunk_size)
+
+def decrypt_file(in_path, out_path, d, n, input_format="binary", chunk_size=STREAM_CHUNK_SIZE, use_mmap=False):
+    """Decrypts a file; use_mmap=True maps binary input and slices blocks straight from the mapping."""
+    with open(in_path, "rb") as in_stream, open(out_path, "wb") as out_stream:
+        if not use_mmap:
+            decrypt_stream(in_stream, out_stream, d, n, input_format, chunk_size)
+            return
+        if input_format != "binary":
+            raise ValueError("use_mmap requires binary input")
+        cipher_block_size, _ = _block_sizes(n)
+        with mmap.mmap(in_stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                _write_plain_blocks(_iter_mmap_cipher_blocks(view, n), out_stream, d, n, max(1, chunk_size // cipher_block_size))
+            finally:
+                view.release()
+
+KEYSTORE_FILENAME = "keys.rks"
+
+def _read_int(prompt, default=None):
+    """Read an integer, returning default when the answer is blank and a default exists."""
+    answer = input(prompt).strip()
+    if not answer and default is not None:
+        return default
+    return int(answer)
+
 # Main Menu
 def main():
+    key = None  # Last generated or loaded key, reused for CRT decryption
     while True:
         print("\nRSA Implementation")
         print("1. Generate Keys")
         print("2. Encrypt a Message")
         print("3. Decrypt a Cipher")
-        print("4. Exit")
+        print("4. Save Key to Key Store")
+        print("5. Load Key from Key Store")
+        print("6. Exit")
 
         choice = input("Select an option: ").strip()
+        hint = " (blank = current key)" if key is not None else ""
 
         if choice == "1":
-            e, n, d = generate_keys(319)
+            e, n, key = generate_keys(319, crt=True)
 
         elif choice == "2":
             message = input("Enter message to encrypt: ")
-            n = int(input("Enter modulus (n): ").strip())
-            e = int(input("Enter public exponent (e): ").strip())
+            n = _read_int(f"Enter modulus (n){hint}: ", key and key.n)
+            e = _read_int(f"Enter public exponent (e){hint}: ", key and key.e)
             output_format = input("Output format (base64/hex, default=base64): ").strip().lower() or "base64"
-            encrypt(message, e, n, output_format)
+            mode = input("Mode (block/char, default=block): ").strip().lower() or "block"
+            encrypt(message, e, n, output_format, mode)
 
         elif choice == "3":
             encoded_cipher = input("Enter cipher text: ").strip()
-            n = int(input("Enter modulus (n): ").strip())
-            d = int(input("Enter private exponent (d): ").strip())
+            n = _read_int(f"Enter modulus (n){hint}: ", key and key.n)
+            d = _read_int(f"Enter private exponent (d){hint}: ", getattr(key, "d", None))
             input_format = input("Cipher format (base64/hex, default=base64): ").strip().lower() or "base64"
+            if isinstance(key, PrivateKey) and (key.n, key.d) == (n, d):
+                d = key
             decrypt(encoded_cipher, d, n, input_format)
 
         elif choice == "4":
+            if key is None:
+                print("No key to save. Generate or load one first.")
+                continue
+            import rsa_keystore
+            key_id = rsa_keystore.append_keys(KEYSTORE_FILENAME, [key])[0]
+            print(f"Saved key to '{KEYSTORE_FILENAME}' with id {key_id} "
+                  f"(fingerprint {rsa_keystore.fingerprint(key.n).hex()}).")
+
+        elif choice == "5":
+            import rsa_keystore
+            lookup = input("Enter key id or fingerprint: ").strip()
+            try:
+                with rsa_keystore.KeyStore(KEYSTORE_FILENAME) as store:
+                    stored = store[int(lookup)] if lookup.isdigit() else store.by_fingerprint(lookup)
+            except (OSError, ValueError, IndexError, KeyError) as err:
+                print(f"Could not load key: {err}")
+                continue
+            # Rebuild from this module's classes so isinstance checks hold when run as a script
+            key = PrivateKey(*stored) if len(stored) == len(PrivateKey._fields) else PublicKey(*stored)
+            print(f"Loaded key: n has {key.n.bit_length()} bits, e = {key.e}")
+
+        elif choice == "6":
             print("Exiting...")
             break
 
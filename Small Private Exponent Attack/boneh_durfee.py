@@ -0,0 +1,336 @@
+"""Boneh-Durfee small private exponent attack (d < N^0.292).
+
+e*d = 1 + k*phi(N) gives f(x, y) = 1 + x*(A + y) = 0 (mod e) with
+A = (N + 1) / 2 and the small root x0 = 2k, y0 = -(p + q) / 2.  The
+lattice is Herrmann and May's unravelled version: with u = x*y + 1,
+f = u + A*x, and the shifts x^i * f^k * e^(m-k) and y^j * f^k * e^(m-k)
+are triangular in u, x, y.  y-shifts whose diagonal exceeds e^m are
+dropped when no other row needs their monomial.  After LLL, two short
+vectors are polynomials that vanish at (x0, y0) over the integers, and
+their resultant gives x0.
+
+LLL keeps the basis and its Gram matrix as exact integers and runs
+Gram-Schmidt in NumPy long doubles (a common power-of-two scale keeps
+everything in range); when the floating-point pass breaks down, the
+exact integer LLL is used instead.
+"""
+import math
+
+import numpy as np
+from sympy import Poly, resultant, symbols
+
+import repo_root
+from factor_cache import cached_engine
+
+# Bits kept above 2^0 after scaling the lattice for floating-point Gram-Schmidt
+FLOAT_RANGE_BITS = min(8000, np.finfo(np.longdouble).maxexp // 2 - 64)
+
+# --- Polynomials in u, x, y as {(a, b, c): coefficient of u^a x^b y^c} ---
+
+def _poly_mul(f, g):
+    product = {}
+    for (a1, b1, c1), k1 in f.items():
+        for (a2, b2, c2), k2 in g.items():
+            key = (a1 + a2, b1 + b2, c1 + c2)
+            product[key] = product.get(key, 0) + k1 * k2
+    return {key: k for key, k in product.items() if k}
+
+def _linearize(f):
+    """Rewrite every x*y as u - 1, so no monomial holds both x and y."""
+    result = {}
+    for (a, b, c), k in f.items():
+        common = min(b, c)
+        # (u - 1)^common expanded with binomial coefficients
+        for i in range(common + 1):
+            key = (a + i, b - common, c - common)
+            result[key] = result.get(key, 0) + k * math.comb(common, i) * (-1) ** (common - i)
+    return {key: k for key, k in result.items() if k}
+
+# --- Lattice construction ---
+
+def build_lattice(e, n, m, t, X, Y):
+    """Return (basis rows, monomials, row labels) of the Herrmann-May lattice with unhelpful rows removed.
+
+    Monomials are (a, b, c) exponents of u^a x^b y^c; a column holds the
+    coefficient times U^a X^b Y^c with U = X*Y + 1.
+    """
+    A = (n + 1) // 2
+    f = {(1, 0, 0): 1, (0, 1, 0): A}  # 1 + x*(A + y) = u + A*x
+    powers = [{(0, 0, 0): 1}]
+    for _ in range(m):
+        powers.append(_poly_mul(powers[-1], f))
+
+    shifts = []  # (label, polynomial, leading monomial)
+    for k in range(m + 1):
+        for i in range(m - k + 1):
+            shifts.append((("x", i, k), _poly_mul(powers[k], {(0, i, 0): e ** (m - k)}), (k, i, 0)))
+    step = m // t if t else 0
+    for j in range(1, t + 1):
+        for k in range(step * j, m + 1):
+            shifts.append((("y", j, k), _linearize(_poly_mul(powers[k], {(0, 0, j): e ** (m - k)})), (k, 0, j)))
+
+    U = X * Y + 1
+    monomials = [lead for _, _, lead in shifts]
+    column = {monomial: col for col, monomial in enumerate(monomials)}
+    rows = []
+    for _, poly, _ in shifts:
+        row = [0] * len(monomials)
+        for (a, b, c), k in poly.items():
+            row[column[(a, b, c)]] = k * U ** a * X ** b * Y ** c
+        rows.append(row)
+
+    # Drop unhelpful y-shifts (diagonal > e^m) from the end while nobody else uses their column
+    bound = e ** m
+    keep = list(range(len(rows)))
+    for r in range(len(rows) - 1, -1, -1):
+        if shifts[r][0][0] != "y" or abs(rows[r][r]) <= bound:
+            continue
+        if all(rows[other][r] == 0 for other in keep if other != r):
+            keep.remove(r)
+    basis = [[rows[r][col] for col in keep] for r in keep]
+    return basis, [monomials[col] for col in keep], [shifts[r][0] for r in keep]
+
+# --- LLL ---
+
+def _to_longdouble(values, shift):
+    """Exact integers as long doubles scaled by 2^-shift (top 63 bits of each kept)."""
+    mantissas, exponents = [], []
+    for value in values:
+        excess = max(abs(value).bit_length() - 63, 0)
+        mantissas.append(value >> excess if value >= 0 else -((-value) >> excess))
+        exponents.append(excess - shift)
+    return np.ldexp(np.array(mantissas, dtype=np.longdouble), np.array(exponents))
+
+class _FloatLLLFailure(Exception):
+    pass
+
+def _lll_float(basis, delta):
+    """LLL on an exact basis and exact Gram matrix, with long double Gram-Schmidt (L^2 style).
+
+    Only the Gram-Schmidt coefficients are approximate; size reduction is
+    repeated while it still uses multipliers too large for the precision.
+    """
+    b = [list(row) for row in basis]
+    n = len(b)
+    gram = [[sum(x * y for x, y in zip(b[i], b[j])) for j in range(n)] for i in range(n)]
+    shift = max(max(g.bit_length() for g in row) for row in gram) - 2 * FLOAT_RANGE_BITS
+    shift = max(shift, 0)
+    mu = np.zeros((n, n), dtype=np.longdouble)
+    r = np.zeros((n, n), dtype=np.longdouble)
+    c = np.zeros(n, dtype=np.longdouble)
+
+    def gram_schmidt_row(k):
+        g = _to_longdouble(gram[k][:k + 1], shift)
+        for j in range(k):
+            r[k, j] = g[j] - np.dot(mu[j, :j], r[k, :j])
+            mu[k, j] = r[k, j] / c[j]
+        c[k] = g[k] - np.dot(mu[k, :k], r[k, :k])
+        if not np.isfinite(c[k]):
+            raise _FloatLLLFailure()
+
+    def subtract(k, j, q):
+        """b_k -= q * b_j, keeping the Gram matrix exact."""
+        b[k] = [x - q * y for x, y in zip(b[k], b[j])]
+        gram[k][k] += q * q * gram[j][j] - 2 * q * gram[k][j]
+        for i in range(n):
+            if i != k:
+                gram[k][i] -= q * gram[j][i]
+                gram[i][k] = gram[k][i]
+
+    c[0] = _to_longdouble(gram[0][:1], shift)[0]
+    k = 1
+    steps, max_steps = 0, 100 * n ** 3 + 10000
+    while k < n:
+        steps += 1
+        if steps > max_steps:
+            raise _FloatLLLFailure()
+        gram_schmidt_row(k)
+        reduced = False
+        for j in range(k - 1, -1, -1):
+            if abs(mu[k, j]) > 0.51:
+                q = int(np.rint(mu[k, j]))
+                subtract(k, j, q)
+                mu[k, :j] -= q * mu[j, :j]
+                mu[k, j] -= q
+                reduced = True
+        if reduced:
+            continue  # The coefficients were approximate: recompute row k and check again
+        # c[k] <= 0 only happens when b*_k vanished in rounding: it is tiny, so swap
+        if c[k] <= 0 or delta * c[k - 1] > c[k] + mu[k, k - 1] ** 2 * c[k - 1]:
+            b[k], b[k - 1] = b[k - 1], b[k]
+            gram[k], gram[k - 1] = gram[k - 1], gram[k]
+            for row in gram:
+                row[k], row[k - 1] = row[k - 1], row[k]
+            k = max(k - 1, 1)
+            if k == 1:
+                c[0] = _to_longdouble(gram[0][:1], shift)[0]
+        else:
+            k += 1
+    return b
+
+def _lll_exact(basis, delta):
+    """Integral LLL (Cohen, Algorithm 2.6.7): only exact integer arithmetic."""
+    num, den = delta.as_integer_ratio() if isinstance(delta, float) else (delta.numerator, delta.denominator)
+    n = len(basis)
+    b = [None] + [list(row) for row in basis]  # 1-based, as in the book
+    d = [1] + [0] * n
+    lam = [[0] * (n + 1) for _ in range(n + 1)]
+
+    def dot(u, v):
+        return sum(x * y for x, y in zip(u, v))
+
+    def reduce(k, l):
+        if 2 * abs(lam[k][l]) > d[l]:
+            q = (2 * lam[k][l] + d[l]) // (2 * d[l])
+            b[k] = [x - q * y for x, y in zip(b[k], b[l])]
+            lam[k][l] -= q * d[l]
+            for i in range(1, l):
+                lam[k][i] -= q * lam[l][i]
+
+    def swap(k, k_max):
+        b[k], b[k - 1] = b[k - 1], b[k]
+        for j in range(1, k - 1):
+            lam[k][j], lam[k - 1][j] = lam[k - 1][j], lam[k][j]
+        l = lam[k][k - 1]
+        B = (d[k - 2] * d[k] + l * l) // d[k - 1]
+        for i in range(k + 1, k_max + 1):
+            t = lam[i][k]
+            lam[i][k] = (d[k] * lam[i][k - 1] - l * t) // d[k - 1]
+            lam[i][k - 1] = (B * t + l * lam[i][k]) // d[k]
+        d[k - 1] = B
+
+    d[1] = dot(b[1], b[1])
+    k, k_max = 2, 1
+    while k <= n:
+        if k > k_max:
+            k_max = k
+            for j in range(1, k + 1):
+                u = dot(b[k], b[j])
+                for i in range(1, j):
+                    u = (d[i] * u - lam[k][i] * lam[j][i]) // d[i - 1]
+                if j < k:
+                    lam[k][j] = u
+                else:
+                    d[k] = u
+        reduce(k, k - 1)
+        if den * (d[k] * d[k - 2] + lam[k][k - 1] ** 2) < num * d[k - 1] ** 2:
+            swap(k, k_max)
+            k = max(2, k - 1)
+        else:
+            for l in range(k - 2, 0, -1):
+                reduce(k, l)
+            k += 1
+    return b[1:]
+
+def lll_reduce(basis, delta=0.75, exact=False):
+    """LLL-reduce the rows of an integer basis; floating-point first unless exact=True."""
+    if len(basis) < 2:
+        return [list(row) for row in basis]
+    if not exact:
+        try:
+            return _lll_float(basis, delta)
+        except _FloatLLLFailure:
+            pass
+    return _lll_exact(basis, delta)
+
+# --- Root extraction ---
+
+def _vector_to_poly(vector, monomials, X, Y, x, y):
+    """Undo the column scaling and substitute u = x*y + 1."""
+    U = X * Y + 1
+    terms = [value // (U ** a * X ** b * Y ** c) * (x * y + 1) ** a * x ** b * y ** c
+             for value, (a, b, c) in zip(vector, monomials) if value]
+    return Poly(sum(terms), x, y)
+
+def _integer_roots(univariate):
+    return [int(root) for root in univariate.ground_roots()]
+
+def find_small_root(e, n, reduced, monomials, X, Y, m, pairs=3):
+    """(x0, y0) from the first few reduced vectors that satisfy Howgrave-Graham's bound, or None."""
+    x, y = symbols("x y")
+    bound = e ** m // math.isqrt(len(monomials))
+    short = [v for v in reduced if math.isqrt(sum(c * c for c in v)) < bound][:pairs + 1]
+    polys = [_vector_to_poly(v, monomials, X, Y, x, y) for v in short]
+    for i in range(len(polys)):
+        for j in range(i + 1, len(polys)):
+            res = Poly(resultant(polys[i].as_expr(), polys[j].as_expr(), y), x)
+            if res.is_zero:
+                continue
+            for x0 in _integer_roots(res):
+                at_x0 = Poly(polys[i].as_expr().subs(x, x0), y)
+                if at_x0.is_zero:
+                    at_x0 = Poly(polys[j].as_expr().subs(x, x0), y)
+                for y0 in _integer_roots(at_x0):
+                    if (1 + x0 * ((n + 1) // 2 + y0)) % e == 0:
+                        return x0, y0
+    return None
+
+# --- Boneh-Durfee Attack Algorithm ---
+
+def _recover_d(e, n, y0):
+    s = -2 * y0  # p + q
+    discriminant = s * s - 4 * n
+    if discriminant < 0:
+        return None
+    root = math.isqrt(discriminant)
+    if root * root != discriminant:
+        return None
+    p, q = (s + root) // 2, (s - root) // 2
+    if p * q != n:
+        return None
+    return pow(e, -1, (p - 1) * (q - 1))
+
+@cached_engine("boneh_durfee", returns="d")
+def boneh_durfee_attack(e, n, delta=0.26, m=5, t=None, lll_delta=0.75, exact=False):
+    """Recover d < N^delta from (e, n); returns d or None.
+
+    m is the number of f powers and t the number of y-shifts (default
+    (1 - 2*delta) * m); larger m reaches closer to N^0.292 with a bigger
+    lattice.  exact=True skips the floating-point LLL.
+    """
+    if t is None:
+        t = int((1 - 2 * delta) * m)
+    X = 2 << math.ceil(delta * math.log2(n))
+    Y = math.isqrt(n)
+
+    print(f"\n--- Boneh-Durfee Attack Started ---")
+    print(f"Public N: {n.bit_length()} bits, delta = {delta}, m = {m}, t = {t}")
+    basis, monomials, _ = build_lattice(e, n, m, t, X, Y)
+    print(f"Lattice dimension: {len(basis)}")
+
+    reduced = lll_reduce(basis, lll_delta, exact=exact)
+    root = find_small_root(e, n, reduced, monomials, X, Y, m)
+    d = _recover_d(e, n, root[1]) if root else None
+    if d:
+        print(f"\n--- d Found! ---")
+        print(f"d: {d}")
+        print(f"k: {root[0] // 2}")
+        print(f"------------------\n")
+        return d
+
+    print(f"\n--- Boneh-Durfee Attack Failed ---")
+    return None
+
+if __name__ == "__main__":
+    print("===== BONEH-DURFEE ATTACK DEMO =====")
+    from Crypto.Util.number import getPrime
+
+    # d ~ N^0.255: just above Wiener's N^0.25 bound
+    PRIME_BITS = 256
+    while True:
+        p, q = getPrime(PRIME_BITS), getPrime(PRIME_BITS)
+        n = p * q
+        phi = (p - 1) * (q - 1)
+        d_secret = getPrime(int(0.255 * n.bit_length()))
+        if n.bit_length() == 2 * PRIME_BITS and math.gcd(d_secret, phi) == 1:
+            break
+    e = pow(d_secret, -1, phi)
+    print(f"Generated N ({n.bit_length()} bits) with d of {d_secret.bit_length()} bits.")
+
+    d_recovered = boneh_durfee_attack(e, n, delta=0.262, m=5)
+    if d_recovered == d_secret:
+        print("Attack successful! Recovered d matches.")
+    else:
+        print("Attack failed.")
+
+    print("\n===== DEMO COMPLETE =====")
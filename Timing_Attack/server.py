@@ -1,28 +1,114 @@
+import argparse
+import asyncio
 import time
 import socket
 import os
+from functools import partial
 
 SECRET_PASSWORD = "secret23"
 PER_CHAR_DELAY = 0.05 
+HOST = '127.0.0.1'
+PORT = 12345
+MAX_CONNECTIONS = 256   # Connections served at once; later ones wait for a free slot
+PIPELINE_DEPTH = 1      # Requests of one connection checked at once (1 keeps them strictly sequential)
 
-def vulnerable_password_check(supplied_password):
+def password_check_delay(supplied_password):
+    """(granted, seconds) of the vulnerable comparison: every matching character costs PER_CHAR_DELAY."""
     if len(supplied_password) > len(SECRET_PASSWORD):
-        time.sleep(len(SECRET_PASSWORD) * PER_CHAR_DELAY)
-        return False
+        return False, len(SECRET_PASSWORD) * PER_CHAR_DELAY
 
     for i in range(len(supplied_password)):
-        if supplied_password[i] == SECRET_PASSWORD[i]:
-            time.sleep(PER_CHAR_DELAY)  
-        else:
-            return False
-    if len(supplied_password) == len(SECRET_PASSWORD):
-        return True
-    return False 
+        if supplied_password[i] != SECRET_PASSWORD[i]:
+            return False, i * PER_CHAR_DELAY
+    return len(supplied_password) == len(SECRET_PASSWORD), len(supplied_password) * PER_CHAR_DELAY
 
-def main():
-    host = '127.0.0.1'
-    port = 12345
+def vulnerable_password_check(supplied_password):
+    granted, delay = password_check_delay(supplied_password)
+    time.sleep(delay)
+    return granted
+
+async def async_password_check(supplied_password):
+    """Same timing leak as vulnerable_password_check, without blocking the other clients."""
+    granted, delay = password_check_delay(supplied_password)
+    await asyncio.sleep(delay)
+    return granted
+
+# --- Asyncio server ---
+
+async def _send_responses(writer, pending, pipeline):
+    # Responses go out in request order, whatever order the checks finish in
+    while (item := await pending.get()) is not None:
+        check, terminator = item
+        response = "ACCESS_GRANTED" if await check else "ACCESS_DENIED"
+        try:
+            writer.write(response.encode() + terminator)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            pipeline.release()
+
+async def handle_connection(reader, writer, connection_slots, pipeline_depth=PIPELINE_DEPTH, verbose=False):
+    """Serve one client.
+
+    A client whose first message contains a newline speaks newline-framed
+    requests and may pipeline them (responses end with a newline too);
+    otherwise every read is one raw password, like attacker_client.py sends.
+    """
+    addr = writer.get_extra_info("peername")
+    async with connection_slots:
+        if verbose:
+            print(f"[*] Kết nối mới từ: {addr}")
+        pending = asyncio.Queue()
+        pipeline = asyncio.Semaphore(pipeline_depth)
+        sender = asyncio.create_task(_send_responses(writer, pending, pipeline))
+        line_mode, buffer = None, b""
+        try:
+            while data := await reader.read(1024):
+                if line_mode is None:
+                    line_mode = b"\n" in data
+                if line_mode:
+                    *requests, buffer = (buffer + data).split(b"\n")
+                else:
+                    requests = [data]
+                for request in requests:
+                    password = request.decode(errors="replace").strip()
+                    if not password:
+                        continue
+                    if verbose:
+                        print(f"[+] {addr} thử: {password}")
+                    await pipeline.acquire()
+                    pending.put_nowait((asyncio.create_task(async_password_check(password)),
+                                        b"\n" if line_mode else b""))
+        except ConnectionResetError:
+            if verbose:
+                print(f"[-] Client {addr} đã reset kết nối đột ngột.")
+        finally:
+            pending.put_nowait(None)
+            await sender
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            if verbose:
+                print(f"[-] Đóng kết nối với {addr}.")
+
+async def serve_async(host=HOST, port=PORT, max_connections=MAX_CONNECTIONS, pipeline_depth=PIPELINE_DEPTH,
+                      verbose=False):
+    """Serve many clients concurrently until cancelled."""
+    connection_slots = asyncio.Semaphore(max_connections)
+    handler = partial(handle_connection, connection_slots=connection_slots,
+                      pipeline_depth=pipeline_depth, verbose=verbose)
+    server = await asyncio.start_server(handler, host, port, reuse_address=True, backlog=max_connections)
+    print(f"[*] Server (asyncio) đang lắng nghe trên {host}:{port}")
+    print(f"[*] Tối đa {max_connections} kết nối, pipeline {pipeline_depth} yêu cầu/kết nối")
+    async with server:
+        await server.serve_forever()
+
+# --- Blocking server (one connection at a time) ---
 
+def serve_blocking(host=HOST, port=PORT):
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     try:
@@ -71,5 +157,32 @@ def main():
         server_socket.close()
         print("[-] Server đã đóng hoàn toàn.")
 
+def main():
+    parser = argparse.ArgumentParser(description="Server mật khẩu có lỗ hổng timing attack (demo).")
+    parser.add_argument("--mode", choices=("async", "blocking"), default="async",
+                        help="async: nhiều kết nối đồng thời; blocking: một kết nối mỗi lần (bản gốc)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--pipeline-depth", type=int, default=PIPELINE_DEPTH)
+    parser.add_argument("--verbose", action="store_true", help="in từng yêu cầu (chậm khi có nhiều client)")
+    args = parser.parse_args()
+
+    if args.mode == "blocking":
+        serve_blocking(args.host, args.port)
+        return
+
+    print(f"[*] Mật khẩu bí mật là: {SECRET_PASSWORD} (chỉ để tham khảo demo)")
+    print(f"[*] PER_CHAR_DELAY được đặt là: {PER_CHAR_DELAY} giây")
+    try:
+        asyncio.run(serve_async(args.host, args.port, args.max_connections, args.pipeline_depth, args.verbose))
+    except OSError as e:
+        print(f"Lỗi bind socket: {e}")
+        os._exit(1)
+    except KeyboardInterrupt:
+        print("\n[*] Server đang tắt do KeyboardInterrupt...")
+    finally:
+        print("[-] Server đã đóng hoàn toàn.")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
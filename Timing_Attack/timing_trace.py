@@ -0,0 +1,349 @@
+"""Raw timing traces: a compact binary recorder and a NumPy analyzer.
+
+A trace file is a small JSON header followed by fixed-size packed
+records, one per probe:
+
+    start_ns, elapsed_ns  int64   perf_counter_ns at send, round-trip time
+    position              uint16  index of the probed character
+    candidate             uint8   index into the header's charset (255: other)
+    connection            uint16  connection id in the engine's pool
+    attempt               uint32  one per measured position (a new one after a backtrack)
+
+TraceRecorder buffers records in a NumPy array and appends them in
+blocks, so a run can be recorded, resumed and analysed later.
+load_trace() maps the records with np.memmap; the analysis works on
+sorted index arrays and never turns samples into Python objects, so
+traces of tens of millions of probes stay cheap.  replay() re-runs the
+SequentialTest rule of timing_stats on recorded samples with other
+thresholds, vectorised over many attempts at once.
+"""
+import argparse
+import json
+import os
+import struct
+import time
+import warnings
+
+import numpy as np
+
+from timing_stats import MAX_SAMPLES, MIN_SAMPLES, MIN_SPREAD, TRIM, Z_DROP
+
+MAGIC = b"TATRACE1"
+TRACE_DTYPE = np.dtype([
+    ("start_ns", "<i8"),
+    ("elapsed_ns", "<i8"),
+    ("position", "<u2"),
+    ("candidate", "u1"),
+    ("connection", "<u2"),
+    ("attempt", "<u4"),
+])
+OTHER_CANDIDATE = 255
+BUFFER_RECORDS = 1 << 16
+REPLAY_BATCH_CELLS = 1 << 22   # Padded samples per replay batch (bounds replay memory)
+DENSE_GROUP_LIMIT = 1 << 26    # Up to here groups are numbered with bincount instead of a sort
+ELAPSED_BITS = 40              # Round trips up to ~18 minutes fit next to the group id in one sort key
+
+# --- Recorder ---
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a timing trace")
+    (length,) = struct.unpack("<I", f.read(4))
+    return json.loads(f.read(length).decode()), len(MAGIC) + 4 + length
+
+class TraceRecorder:
+    """Append raw samples to a trace file.
+
+    An existing trace with the same charset is appended to; its attempt
+    numbers continue where it stopped.
+    """
+
+    def __init__(self, path, charset, metadata=None, buffer_size=BUFFER_RECORDS):
+        self.path = path
+        self.charset = charset
+        self._index = {char: i for i, char in enumerate(charset)}
+        self._buffer = np.zeros(buffer_size, TRACE_DTYPE)
+        self._count = 0
+        self.attempt = 0
+        self.samples = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            header, offset = self._existing_header(path)
+            if header["charset"] != charset:
+                raise ValueError(f"{path} was recorded with another charset")
+            records = load_trace(path)[1]
+            self.attempt = int(records["attempt"].max()) if len(records) else 0
+            # Drop a record cut short by a crash before appending whole ones
+            with open(path, "r+b") as f:
+                f.truncate(offset + len(records) * TRACE_DTYPE.itemsize)
+            self._file = open(path, "ab")
+        else:
+            header = {"charset": charset, "created": time.time(), "dtype": TRACE_DTYPE.descr, **(metadata or {})}
+            encoded = json.dumps(header).encode()
+            self._file = open(path, "wb")
+            self._file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+
+    @staticmethod
+    def _existing_header(path):
+        with open(path, "rb") as f:
+            return _read_header(f)
+
+    def new_attempt(self):
+        """Start the samples of a new measured position; returns its attempt number."""
+        self.attempt += 1
+        return self.attempt
+
+    def record(self, start_ns, elapsed_ns, position, candidate, connection):
+        self._buffer[self._count] = (start_ns, elapsed_ns, position,
+                                     self._index.get(candidate, OTHER_CANDIDATE), connection, self.attempt)
+        self._count += 1
+        self.samples += 1
+        if self._count == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        if self._count:
+            self._file.write(self._buffer[:self._count].tobytes())
+            self._count = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# --- Analyzer ---
+
+def load_trace(path):
+    """(header dict, memory-mapped record array) of a trace file."""
+    with open(path, "rb") as f:
+        header, offset = _read_header(f)
+    count = (os.path.getsize(path) - offset) // TRACE_DTYPE.itemsize
+    if count == 0:
+        return header, np.zeros(0, TRACE_DTYPE)
+    return header, np.memmap(path, dtype=TRACE_DTYPE, mode="r", offset=offset, shape=(count,))
+
+def _groups(records, by):
+    """Group id per record for by = "attempt" or "position", plus the (key, candidate) of every group."""
+    combined = records[by].astype(np.int64) * 256 + records["candidate"]
+    if combined.max() < DENSE_GROUP_LIMIT:
+        present = np.bincount(combined) > 0
+        unique = np.flatnonzero(present)
+        inverse = (np.cumsum(present) - 1)[combined]
+    else:
+        unique, inverse = np.unique(combined, return_inverse=True)
+    return inverse, unique // 256, (unique % 256).astype(np.uint8)
+
+def candidate_stats(records, by="attempt", confidence=1.96):
+    """Per-(attempt or position, candidate) sample statistics, in seconds.
+
+    Returns a dict of equal-length arrays: key, candidate, count, mean,
+    std, ci_low/ci_high (mean +- confidence standard errors), median,
+    median_low/median_high (distribution-free order-statistic interval),
+    p05 and p95.
+    """
+    group, keys, candidates = _groups(records, by)
+    # One in-place sort of (group, elapsed) packed into int64 orders every group's samples
+    packed = np.clip(records["elapsed_ns"], 0, (1 << ELAPSED_BITS) - 1)
+    packed |= group << ELAPSED_BITS
+    del group
+    packed.sort()
+    counts = np.bincount(packed >> ELAPSED_BITS, minlength=len(keys))
+    packed &= (1 << ELAPSED_BITS) - 1
+    ordered = packed.astype(np.float64) / 1e9
+    del packed
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    sums = np.add.reduceat(ordered, starts)
+    mean = sums / counts
+    squares = np.add.reduceat((ordered - mean.repeat(counts)) ** 2, starts)
+    std = np.sqrt(squares / np.maximum(counts - 1, 1))
+    half_width = confidence * std / np.sqrt(counts)
+
+    def rank(fraction, spread=0.0):
+        index = np.floor(fraction * (counts - 1) + spread).astype(np.int64)
+        return ordered[starts + np.clip(index, 0, counts - 1)]
+
+    median_spread = confidence * np.sqrt(counts) / 2
+    return {
+        "key": keys,
+        "candidate": candidates,
+        "count": counts,
+        "mean": mean,
+        "std": std,
+        "ci_low": mean - half_width,
+        "ci_high": mean + half_width,
+        "median": (rank(0.5) + ordered[starts + counts // 2]) / 2,
+        "median_low": rank(0.5, -median_spread),
+        "median_high": rank(0.5, median_spread + 1),
+        "p05": rank(0.05),
+        "p95": rank(0.95),
+    }
+
+def distributions(records, by="attempt", bins=64, clip=(0.1, 99.9)):
+    """(bin edges, histogram per group, group keys, group candidates) on common bins.
+
+    The bin range covers the clip percentiles of all samples so a few
+    stalls do not flatten every histogram.
+    """
+    group, keys, candidates = _groups(records, by)
+    elapsed = records["elapsed_ns"].astype(np.float64) / 1e9
+    low, high = np.percentile(elapsed, clip)
+    edges = np.linspace(low, high if high > low else low + 1e-9, bins + 1)
+    index = np.clip(np.searchsorted(edges, elapsed, side="right") - 1, 0, bins - 1)
+    counts = np.bincount(group * bins + index, minlength=len(keys) * bins).reshape(len(keys), bins)
+    return edges, counts, keys, candidates
+
+def _trimmed_locations(values, used, trim):
+    """Trimmed mean of the first `used` samples of every (attempt, candidate) row; NaN when empty."""
+    masked = np.where(np.arange(values.shape[2]) < used[..., None], values, np.nan)
+    ordered = np.sort(masked, axis=2)
+    cut = np.maximum(np.floor(used * trim).astype(np.int64), (used >= 3).astype(np.int64))
+    cumulative = np.concatenate((np.zeros(used.shape + (1,)), np.nancumsum(ordered, axis=2)), axis=2)
+    upper = np.take_along_axis(cumulative, (used - cut)[..., None], axis=2)[..., 0]
+    lower = np.take_along_axis(cumulative, cut[..., None], axis=2)[..., 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        locations = (upper - lower) / (used - 2 * cut)
+    middle_low = np.take_along_axis(ordered, np.maximum(used - 1, 0)[..., None] // 2, axis=2)[..., 0]
+    middle_high = np.take_along_axis(ordered, (used // 2)[..., None], axis=2)[..., 0]
+    medians = np.where(used > 0, (middle_low + middle_high) / 2, np.nan)
+    return masked, np.where(used > 0, locations, np.nan), medians
+
+def _replay_batch(values, available, z, min_samples, max_samples, trim):
+    batch = len(available)
+    alive = available > 0
+    used = np.zeros_like(available)
+    decided = np.zeros(batch, bool)
+    choice = np.full(batch, -1)
+    confident = np.zeros(batch, bool)
+    requests = np.zeros(batch, np.int64)
+    rows = np.arange(batch)
+
+    rounds = min_samples
+    while not decided.all():
+        active = ~decided
+        used = np.where(alive & active[:, None], np.minimum(rounds, available), used)
+        masked, locations, medians = _trimmed_locations(values, used, trim)
+
+        residuals = np.abs(masked - medians[..., None])
+        residuals[used < 2] = np.nan
+        pooled = np.nanmedian(residuals.reshape(batch, -1), axis=1)
+        spread = np.maximum(MIN_SPREAD, np.nan_to_num(1.4826 * pooled, nan=MIN_SPREAD))
+        errors = spread[:, None] / np.sqrt(np.maximum(used, 1))
+
+        # Like SequentialTest.update: nothing is dropped before every contender has min_samples
+        ready = np.all(~alive | (used >= min_samples) | (used >= available), axis=1) & active
+        alive_locations = np.where(alive, locations, -np.inf)
+        leader = np.argmax(alive_locations, axis=1)
+        gap = locations[rows, leader][:, None] - locations
+        bound = z * np.hypot(errors[rows, leader][:, None], errors)
+        alive &= ~(ready[:, None] & (gap >= bound))
+
+        exhausted = np.all(~alive | (used >= max_samples) | (used >= available), axis=1)
+        newly = active & ((alive.sum(axis=1) == 1) | exhausted)
+        leader = np.argmax(np.where(alive, locations, -np.inf), axis=1)
+        choice[newly] = leader[newly]
+        confident[newly] = alive.sum(axis=1)[newly] == 1
+        requests[newly] = used.sum(axis=1)[newly]
+        decided |= newly
+        rounds += 1
+    return choice, confident, requests
+
+def replay(records, z=Z_DROP, min_samples=MIN_SAMPLES, max_samples=MAX_SAMPLES, trim=TRIM):
+    """Decisions SequentialTest would take on every recorded attempt.
+
+    Each candidate's samples are used in the order they were sent;
+    a candidate whose recorded samples run out is treated as exhausted.
+    Backtracking is not re-run: every attempt is decided on its own.
+    Returns a dict of arrays: attempt, position, candidate (charset index),
+    confident and requests (samples the rule needed).
+    """
+    group, keys, candidates = _groups(records, "attempt")
+    order = np.lexsort((records["start_ns"], group))
+    counts = np.bincount(group, minlength=len(keys))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sample_group = group[order].astype(np.int32)
+    del group
+    elapsed = records["elapsed_ns"][order].astype(np.float64)
+    elapsed /= 1e9
+    positions_by_group = records["position"][order[starts]].astype(np.int64)
+    del order
+    ranks = np.arange(len(elapsed), dtype=np.int32)
+    ranks -= np.repeat(starts.astype(np.int32), counts)
+
+    attempts, attempt_of_group = np.unique(keys, return_inverse=True)
+    charset_size = int(candidates.max()) + 1
+    available = np.zeros((len(attempts), charset_size), np.int64)
+    available[attempt_of_group, candidates] = counts
+    width = max(int(counts.max()), 1)
+    positions = np.zeros(len(attempts), np.int64)
+    positions[attempt_of_group] = positions_by_group
+    # Groups are numbered by attempt first, so samples are already ordered by attempt
+    sample_attempt = attempt_of_group.astype(np.int32)[sample_group]
+    sample_candidate = candidates[sample_group]
+    del sample_group
+
+    choice = np.empty(len(attempts), np.int64)
+    confident = np.empty(len(attempts), bool)
+    requests = np.empty(len(attempts), np.int64)
+    per_batch = max(1, REPLAY_BATCH_CELLS // (charset_size * width))
+    for begin in range(0, len(attempts), per_batch):
+        end = min(begin + per_batch, len(attempts))
+        values = np.full((end - begin, charset_size, width), np.nan)
+        lo, hi = np.searchsorted(sample_attempt, [begin, end])
+        values[sample_attempt[lo:hi] - begin, sample_candidate[lo:hi], ranks[lo:hi]] = elapsed[lo:hi]
+        # Empty rows give all-NaN medians; they are masked out by `alive`
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            choice[begin:end], confident[begin:end], requests[begin:end] = _replay_batch(
+                values, available[begin:end], z, min_samples, max_samples, trim)
+    return {"attempt": attempts, "position": positions, "candidate": choice,
+            "confident": confident, "requests": requests}
+
+# --- Command line ---
+
+def _print_summary(header, records, args):
+    charset = header["charset"] + "?" * (256 - len(header["charset"]))
+    print(f"[*] {len(records)} mẫu, {len(np.unique(records['attempt']))} lượt đo, "
+          f"{len(np.unique(records['connection']))} kết nối")
+
+    stats = candidate_stats(records, by="position")
+    for position in np.unique(stats["key"]):
+        rows = np.flatnonzero(stats["key"] == position)
+        top = rows[np.argsort(stats["median"][rows])[::-1][:3]]
+        ranked = ", ".join(f"'{charset[stats['candidate'][i]]}' {stats['median'][i]:.6f} s "
+                           f"[{stats['median_low'][i]:.6f}, {stats['median_high'][i]:.6f}] (n={stats['count'][i]})"
+                           for i in top)
+        print(f"    vị trí {position + 1}: {ranked}")
+
+    decisions = replay(records, args.z, args.min_samples, args.max_samples, args.trim)
+    print(f"\n[*] Phát lại (z={args.z}, min={args.min_samples}, max={args.max_samples}, trim={args.trim}): "
+          f"{len(decisions['attempt'])} quyết định, trung bình {decisions['requests'].mean():.1f} mẫu, "
+          f"{decisions['confident'].mean() * 100:.1f}% chắc chắn")
+    if args.secret:
+        expected = np.array([header["charset"].find(args.secret[p]) if p < len(args.secret) else -1
+                             for p in range(int(decisions["position"].max()) + 1)])
+        correct = decisions["candidate"] == expected[decisions["position"]]
+        print(f"[*] Đúng {correct.sum()}/{len(correct)} ({correct.mean() * 100:.1f}%) so với '{args.secret}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Phân tích trace thời gian (memory-mapped).")
+    parser.add_argument("trace")
+    parser.add_argument("--secret", help="mật khẩu đúng, để tính tỉ lệ quyết định đúng")
+    parser.add_argument("--z", type=float, default=Z_DROP)
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    parser.add_argument("--max-samples", type=int, default=MAX_SAMPLES)
+    parser.add_argument("--trim", type=float, default=TRIM)
+    args = parser.parse_args()
+
+    header, records = load_trace(args.trace)
+    if len(records) == 0:
+        print("[!] Trace rỗng.")
+    else:
+        _print_summary(header, records, args)
@@ -0,0 +1,227 @@
+"""Bernstein batch GCD: find RSA moduli that share a prime across a large key corpus.
+
+A product tree over all moduli is built bottom-up and a remainder tree
+(P mod n_i^2) is pushed back down it, so every modulus learns
+gcd(n_i, prod_{j != i} n_j) in quasi-linear time instead of comparing
+all pairs.  Tree levels can be spilled to files, and each level is
+split into chunks for a process pool with at most two chunks per worker
+in flight, so memory stays bounded by the window rather than the level.
+
+CPython's own big-int division is quadratic, which dominates the top of
+the tree; when gmpy2 is installed its GMP integers are used instead and
+the scan scales to hundreds of thousands of keys.
+"""
+import argparse
+import math
+import os
+import re
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from Crypto.PublicKey import RSA
+
+from bounded_map import bounded_map
+
+try:
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
+PEM_BLOCK = re.compile(rb"-----BEGIN ([A-Z ]*)KEY-----.+?-----END \1KEY-----", re.S)
+KEY_SUFFIXES = (".pub", ".pem", ".key")
+CHUNK_SIZE = 256  # Tree nodes per task sent to a worker
+
+# --- Loading keys ---
+
+def _pem_blocks_from_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    for index, match in enumerate(PEM_BLOCK.finditer(data)):
+        yield f"{path}#{index}", match.group(0)
+
+def iter_pem_blocks(source):
+    """Yield (label, PEM block) from a PEM file/bundle or every key file under a directory."""
+    if not os.path.isdir(source):
+        yield from _pem_blocks_from_file(source)
+        return
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            if name.endswith(KEY_SUFFIXES):
+                yield from _pem_blocks_from_file(os.path.join(root, name))
+
+def parse_public_key(pem):
+    """(n, e) of a PEM key block, or None if it is not an RSA key."""
+    try:
+        key = RSA.import_key(pem)
+    except (ValueError, IndexError, TypeError):
+        return None
+    return key.n, key.e
+
+def iter_public_keys(source):
+    """Yield (label, n, e) from a PEM file/bundle or every key file under a directory."""
+    for label, pem in iter_pem_blocks(source):
+        key = parse_public_key(pem)
+        if key is not None:
+            yield (label,) + key
+
+def iter_moduli(source):
+    """Yield (label, n) from a PEM file/bundle or every key file under a directory."""
+    for label, n, _ in iter_public_keys(source):
+        yield label, n
+
+# --- Tree levels: a list in memory or a file of length-prefixed integers ---
+
+def _write_level(values, spill_dir, name):
+    """Store a level and return (level, number of values)."""
+    if spill_dir is None:
+        values = list(values)
+        return values, len(values)
+    path = os.path.join(spill_dir, name)
+    count = 0
+    with open(path, "wb") as f:
+        for value in values:
+            value = int(value)
+            raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+            f.write(struct.pack(">Q", len(raw)))
+            f.write(raw)
+            count += 1
+    return path, count
+
+def _read_level(level):
+    if isinstance(level, list):
+        yield from level
+        return
+    with open(level, "rb") as f:
+        while True:
+            header = f.read(8)
+            if not header:
+                return
+            (length,) = struct.unpack(">Q", header)
+            yield mpz(int.from_bytes(f.read(length), "big"))
+
+def _drop_level(level):
+    if not isinstance(level, list):
+        os.remove(level)
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _map_chunks(executor, window, func, chunks):
+    """Apply func to each chunk (in a pool if there is one) and flatten the ordered results."""
+    for result in bounded_map(executor, func, chunks, window):
+        yield from result
+
+# --- Worker functions (top level so they can be pickled) ---
+
+def _pair_products(values):
+    return [values[i] * values[i + 1] if i + 1 < len(values) else values[i] for i in range(0, len(values), 2)]
+
+def _child_remainders(items):
+    """items: (parent remainder, left child[, right child]) -> remainders modulo child^2."""
+    return [parent % (child * child) for parent, *children in items for child in children]
+
+def _leaf_gcds(items):
+    return [int(math.gcd(n, (remainder % (n * n)) // n)) for remainder, n in items]
+
+def _node_groups(parents, children):
+    """Pair each parent remainder with its one or two children."""
+    child_iter = iter(children)
+    for parent in parents:
+        group = [parent, next(child_iter)]
+        right = next(child_iter, None)
+        if right is not None:
+            group.append(right)
+        yield group
+
+def batch_gcd(moduli, workers=None, spill_dir=None):
+    """Return gcd(n_i, product of all other moduli) for every modulus, in input order.
+
+    spill_dir stores every tree level as a file; workers=1 stays in this process.
+    """
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    window = 2 * (workers or os.cpu_count())
+    try:
+        level, count = _write_level((mpz(n) for n in moduli), spill_dir, "level0")
+        levels = [level]
+        if count == 0:
+            _drop_level(level)
+            return []
+
+        # Product tree, bottom-up.  Chunks have an even size so pairs never straddle two chunks.
+        while count > 1:
+            products = _map_chunks(executor, window, _pair_products, _chunks(_read_level(levels[-1]), 2 * CHUNK_SIZE))
+            level, count = _write_level(products, spill_dir, f"level{len(levels)}")
+            levels.append(level)
+
+        # Remainder tree, top-down: the root's remainder is the full product itself
+        remainders = levels[-1]
+        for depth in range(len(levels) - 2, -1, -1):
+            groups = _node_groups(_read_level(remainders), _read_level(levels[depth]))
+            new_remainders, _ = _write_level(_map_chunks(executor, window, _child_remainders, _chunks(groups, CHUNK_SIZE)),
+                                             spill_dir, f"remainder{depth}")
+            _drop_level(remainders)
+            if depth > 0:
+                _drop_level(levels[depth])
+            remainders = new_remainders
+
+        leaves = zip(_read_level(remainders), _read_level(levels[0]))
+        gcds = list(_map_chunks(executor, window, _leaf_gcds, _chunks(leaves, CHUNK_SIZE)))
+        _drop_level(remainders)
+        if remainders is not levels[0]:
+            _drop_level(levels[0])
+        return gcds
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+def find_shared_factors(source, workers=None, spill_dir=None):
+    """Scan a directory or PEM bundle and return (label, n, p, q) for every modulus sharing a prime.
+
+    p and q are None when n shares both primes with other keys (e.g. a duplicated key)
+    and cannot be split from the others.
+    """
+    labels, moduli = [], []
+    for label, n in iter_moduli(source):
+        labels.append(label)
+        moduli.append(n)
+
+    if spill_dir is not None:
+        os.makedirs(spill_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=spill_dir) as level_dir:
+            gcds = batch_gcd(moduli, workers, level_dir)
+    else:
+        gcds = batch_gcd(moduli, workers)
+
+    weak = [i for i, g in enumerate(gcds) if g != 1]
+    results = []
+    for i in weak:
+        n, g = moduli[i], gcds[i]
+        if g == n:
+            # Both primes are shared: split against the other weak moduli directly
+            g = next((d for j in weak if j != i for d in [math.gcd(n, moduli[j])] if 1 < d < n), n)
+        p, q = (min(g, n // g), max(g, n // g)) if g != n else (None, None)
+        results.append((labels[i], n, p, q))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find RSA public keys that share a prime factor (batch GCD).")
+    parser.add_argument("source", help="PEM file/bundle or directory of key files")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--spill-dir", default=None, help="store tree levels on disk under this directory")
+    args = parser.parse_args()
+
+    print(f"🧪 Batch GCD over keys in '{args.source}'")
+    results = find_shared_factors(args.source, args.workers, args.spill_dir)
+    for label, n, p, q in results:
+        if p is None:
+            print(f"⚠️  {label}: shares both primes with other keys (duplicate?)")
+        else:
+            print(f"✅ {label}: p = {p}, q = {q}")
+    print(f"[*] {len(results)} weak moduli found.")
@@ -0,0 +1,40 @@
+"""Feed a process pool from an iterator without submitting it all at once.
+
+Executor.map, like a loop that submits every task, pulls the whole input
+before the first result comes back, so every pending task and its
+pickled arguments sit in memory together.  bounded_map keeps at most
+`window` tasks in flight and submits the next one as results are taken.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+
+def bounded_map(executor, func, iterable, window, ordered=True):
+    """Yield func(item) for every item, with at most `window` tasks submitted at a time.
+
+    ordered=False yields results as they complete instead of in input
+    order.  executor=None maps in this process.  Closing the generator
+    early cancels the tasks that have not started.
+    """
+    tasks = iter(iterable)
+    if executor is None:
+        yield from map(func, tasks)
+        return
+    pending = ()
+    try:
+        if ordered:
+            pending = deque(executor.submit(func, task) for task in islice(tasks, window))
+            while pending:
+                result = pending.popleft().result()
+                pending.extend(executor.submit(func, task) for task in islice(tasks, 1))
+                yield result
+        else:
+            pending = {executor.submit(func, task) for task in islice(tasks, window)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending |= {executor.submit(func, task) for task in islice(tasks, len(done))}
+                for future in done:
+                    yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
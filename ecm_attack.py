@@ -0,0 +1,149 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from bounded_map import bounded_map
+from factor_cache import cached_engine
+from pollard_pm1_attack import prime_power_exponents, prime_sieve
+
+STAGE2_D = 2310  # 2*3*5*7*11: giant step size of stage 2
+BABY_STEPS = [j for j in range(1, STAGE2_D // 2, 2) if math.gcd(j, STAGE2_D) == 1]
+
+class _FactorFound(Exception):
+    def __init__(self, factor):
+        self.factor = factor
+
+# --- Montgomery curve arithmetic on (X : Z), By^2 = x^3 + Ax^2 + x ---
+
+def _double(P, a24, n):
+    X, Z = P
+    s = (X + Z) * (X + Z) % n
+    d = (X - Z) * (X - Z) % n
+    t = s - d  # 4XZ
+    return s * d % n, t * (d + a24 * t) % n
+
+def _add(P, Q, diff, n):
+    """P + Q given P - Q (differential addition)."""
+    u = (P[0] - P[1]) * (Q[0] + Q[1])
+    v = (P[0] + P[1]) * (Q[0] - Q[1])
+    return diff[1] * ((u + v) ** 2 % n) % n, diff[0] * ((u - v) ** 2 % n) % n
+
+def _ladder(k, P, a24, n):
+    """[k]P by the Montgomery ladder."""
+    if k == 1:
+        return P
+    R0, R1 = P, _double(P, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == "1":
+            R0, R1 = _add(R1, R0, P, n), _double(R1, a24, n)
+        else:
+            R0, R1 = _double(R0, a24, n), _add(R1, R0, P, n)
+    return R0
+
+def _suyama_curve(n, sigma):
+    """Starting point and (A + 2) / 4 of Suyama's parametrization for sigma."""
+    u = (sigma * sigma - 5) % n
+    v = 4 * sigma % n
+    denominator = 16 * pow(u, 3, n) * v % n
+    g = math.gcd(denominator, n)
+    if g != 1:
+        raise _FactorFound(g)
+    a24 = pow(v - u, 3, n) * (3 * u + v) * pow(denominator, -1, n) % n
+    return (pow(u, 3, n), pow(v, 3, n)), a24
+
+def _stage2(n, Q, a24, B1, B2):
+    """Baby-step giant-step continuation over primes q = k*D +- j in (B1, B2]."""
+    flags = prime_sieve(B2 + STAGE2_D)
+    # Baby steps [j]Q for odd j < D/2, keeping those coprime to D
+    Q2 = _double(Q, a24, n)
+    baby = {1: Q}
+    previous, current = Q, _add(Q2, Q, Q, n)  # [1]Q, [3]Q
+    for j in range(3, STAGE2_D // 2, 2):
+        baby[j] = current
+        previous, current = current, _add(current, Q2, previous, n)
+    baby = [(j, baby[j]) for j in BABY_STEPS]
+
+    QD = _ladder(STAGE2_D, Q, a24, n)
+    k = max(1, B1 // STAGE2_D)
+    G_prev = _ladder((k - 1) * STAGE2_D, Q, a24, n) if k > 1 else None
+    G = _ladder(k * STAGE2_D, Q, a24, n)
+    acc = 1
+    while (k - 1) * STAGE2_D <= B2:
+        center = k * STAGE2_D
+        for j, P in baby:
+            if (B1 < center - j <= B2 and flags[center - j]) or (B1 < center + j <= B2 and flags[center + j]):
+                # x(G) == x(P) mod p exactly when [k*D -+ j]Q is the identity mod p
+                acc = acc * (G[0] * P[1] - P[0] * G[1]) % n
+        g = math.gcd(acc, n)
+        if g != 1:
+            return g
+        G_prev, G = G, (_double(G, a24, n) if G_prev is None else _add(G, QD, G_prev, n))
+        k += 1
+    return 1
+
+def ecm_curve(n, sigma, B1=11000, B2=None):
+    """Run one ECM curve (Suyama parameter sigma); returns a non-trivial factor or None."""
+    if B2 is None:
+        B2 = 100 * B1
+    try:
+        Q, a24 = _suyama_curve(n, sigma)
+    except _FactorFound as found:
+        return found.factor if found.factor != n else None
+
+    for q in prime_power_exponents(B1):
+        Q = _ladder(q, Q, a24, n)
+    g = math.gcd(Q[1], n)
+    if g == 1 and B2 > B1:
+        g = _stage2(n, Q, a24, B1, B2)
+    return g if 1 < g < n else None
+
+def _curve_batch(n, sigmas, B1, B2):
+    for sigma in sigmas:
+        factor = ecm_curve(n, sigma, B1, B2)
+        if factor:
+            return factor
+    return None
+
+def _sigma_batches(n, curves, curves_per_task):
+    """Random Suyama parameters in tasks of curves_per_task, drawn only when a task is submitted."""
+    for start in range(0, curves, curves_per_task):
+        yield [random.randint(6, n - 1) for _ in range(min(curves_per_task, curves - start))]
+
+@cached_engine("ecm")
+def ecm_factor(n, B1=11000, B2=None, curves=100, workers=None, curves_per_task=4):
+    """Lenstra ECM with Montgomery curves, spread over a process pool.
+
+    Curves are submitted in tasks of curves_per_task, at most two tasks
+    per worker at a time, so a large curves costs nothing until the
+    curves run; the first factor found cancels the tasks that have not
+    started yet.  workers=1 runs in this process.  Returns a non-trivial
+    factor or None.
+    """
+    if n % 2 == 0:
+        return 2
+    tasks = _sigma_batches(n, curves, curves_per_task)
+    run_batch = partial(_curve_batch, n, B1=B1, B2=B2)
+    if workers == 1:
+        return next(filter(None, map(run_batch, tasks)), None)
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = bounded_map(executor, run_batch, tasks, 2 * workers, ordered=False)
+        factor = next(filter(None, results), None)
+        results.close()
+    return factor
+
+if __name__ == "__main__":
+    # Ví dụ: thừa số 12 chữ số ẩn trong modulus lớn
+    p = 100000000003
+    q = 1000000000000000000000000000057
+    n = p * q
+
+    print(f"🧪 ECM attack on n = {n}")
+    d = ecm_factor(n, B1=2000, curves=40)
+    if d:
+        print(f"✅ Found factor: d = {d}, n/d = {n // d}")
+    else:
+        print("❌ Attack failed.")
@@ -0,0 +1,208 @@
+"""Persistent cache of broken moduli, shared by every attack script.
+
+Results live in a sqlite3 file keyed by key_fingerprint.fingerprint of
+the modulus, as in rsa_keystore: the factors, the private
+exponent when it was recovered, which method found them and how long
+that method ran (wall clock).  The file is opened in WAL mode, so several worker processes can
+read while one writes; each process opens its own connection.  An
+in-process LRU answers repeated lookups without touching the file.
+
+Engines wrapped with cached_engine() consult the default cache before
+doing any work.  Set RSA_FACTOR_CACHE to another path, or to "off" to
+disable caching.
+"""
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sympy import isprime
+
+from key_fingerprint import fingerprint
+
+CacheEntry = namedtuple("CacheEntry", "n p q d e method seconds")
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "factor_cache.sqlite")
+LRU_SIZE = 1024
+BUSY_TIMEOUT = 30  # Seconds a writer waits for another process's lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS factors (
+    fingerprint BLOB PRIMARY KEY,
+    n TEXT NOT NULL,
+    p TEXT,
+    q TEXT,
+    d TEXT,
+    e TEXT,
+    method TEXT,
+    seconds REAL,
+    created REAL NOT NULL
+)
+"""
+
+def _to_text(value):
+    return None if value is None else format(value, "x")
+
+def _from_text(value):
+    return None if value is None else int(value, 16)
+
+class FactorCache:
+    """sqlite3 factor store with an LRU in front; safe to share between processes."""
+
+    def __init__(self, path=CACHE_PATH, lru_size=LRU_SIZE, timeout=BUSY_TIMEOUT):
+        self.path = path
+        self.lru_size = lru_size
+        self.timeout = timeout
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        # A connection must not cross a fork: reopen in every new process
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                               isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(SCHEMA)
+            self._pid = os.getpid()
+            self._lru.clear()
+        return self._connection
+
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, n):
+        """CacheEntry for n, or None if it has never been broken."""
+        key = fingerprint(n)
+        with self._lock:
+            connection = self._connect()
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+            row = connection.execute("SELECT n, p, q, d, e, method, seconds FROM factors WHERE fingerprint = ?",
+                                     (key,)).fetchone()
+            if row is None or _from_text(row[0]) != n:
+                return None
+            entry = CacheEntry(n, *(_from_text(value) for value in row[1:5]), row[5], row[6])
+            self._remember(key, entry)
+            return entry
+
+    def put(self, n, p=None, q=None, d=None, e=None, method=None, seconds=None):
+        """Record what is known about n.
+
+        Fields already stored are kept (the first method to break a key
+        keeps the credit); missing ones such as d are filled in.  p and q
+        are only stored when they are the two prime factors of n: a
+        factor of a modulus with more primes leaves them unset, since
+        every cache hit derives d from (p - 1)(q - 1).  Returns the merged
+        CacheEntry.
+        """
+        if p is not None and q is None:
+            q = n // p
+        if p is not None and not (p * q == n and isprime(p) and isprime(q)):
+            p = q = None
+        if p is not None and p > q:
+            p, q = q, p
+        if p is None and d is None:
+            return self.get(n)
+        key = fingerprint(n)
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                """INSERT INTO factors (fingerprint, n, p, q, d, e, method, seconds, created)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(fingerprint) DO UPDATE SET
+                       p = COALESCE(p, excluded.p), q = COALESCE(q, excluded.q),
+                       d = COALESCE(d, excluded.d), e = COALESCE(e, excluded.e),
+                       method = COALESCE(method, excluded.method),
+                       seconds = COALESCE(seconds, excluded.seconds)""",
+                (key, _to_text(n), _to_text(p), _to_text(q), _to_text(d), _to_text(e), method, seconds, time.time()))
+            self._lru.pop(key, None)
+        return self.get(n)
+
+    def forget(self, n):
+        key = fingerprint(n)
+        with self._lock:
+            self._connect().execute("DELETE FROM factors WHERE fingerprint = ?", (key,))
+            self._lru.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM factors").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._lru.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+_default_cache = None
+
+def default_cache():
+    """The process-wide cache (RSA_FACTOR_CACHE overrides the path), or None when disabled."""
+    global _default_cache
+    path = os.environ.get("RSA_FACTOR_CACHE", CACHE_PATH)
+    if path.lower() in ("", "0", "off", "none"):
+        return None
+    if _default_cache is None or _default_cache.path != path:
+        _default_cache = FactorCache(path)
+    return _default_cache
+
+def set_default_cache(cache):
+    """Replace the process-wide cache (None falls back to RSA_FACTOR_CACHE)."""
+    global _default_cache
+    _default_cache = cache
+
+def cached_engine(method, returns="factor"):
+    """Decorate an engine so it checks the default cache first and records its successes.
+
+    returns describes the engine's result: "factor" for f(n, ...) -> factor,
+    "pair" for f(n, ...) -> (p, q), "d" for f(e, n, ...) -> private exponent.
+    """
+    def decorator(engine):
+        @functools.wraps(engine)
+        def wrapper(*args, **kwargs):
+            e, n = args[:2] if returns == "d" else (None, args[0])
+            cache = default_cache()
+            if cache is None or n < 4:
+                return engine(*args, **kwargs)
+
+            entry = cache.get(n)
+            if entry is not None:
+                if returns == "d":
+                    if entry.d is not None and entry.e == e:
+                        return entry.d
+                    if entry.p is not None:
+                        try:
+                            return pow(e, -1, (entry.p - 1) * (entry.q - 1))
+                        except ValueError:
+                            pass
+                elif entry.p is not None:
+                    return (entry.p, entry.q) if returns == "pair" else entry.p
+
+            start = time.time()
+            result = engine(*args, **kwargs)
+            seconds = time.time() - start
+            if returns == "d":
+                if result:
+                    cache.put(n, d=result, e=e, method=method, seconds=seconds)
+            else:
+                factor = result[0] if returns == "pair" and result else result
+                if factor and 1 < factor < n:
+                    cache.put(n, factor, method=method, seconds=seconds)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,287 @@
+"""Pick the attack for an RSA key automatically.
+
+factor_key(n, e) first runs the cheap checks in this process (trial
+division, a short Fermat run, Wiener and extended Wiener when e is
+known), then races the general engines in separate processes, each with
+its own time budget; Boneh-Durfee joins the race when e is as large as
+a small d requires.
+The first factor wins, the other engines are terminated, and the result
+records how long every engine ran so the schedule can be tuned.
+Keys broken before are answered from the factor cache without running
+anything.
+"""
+import importlib.util
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from contextlib import redirect_stdout
+from io import StringIO
+
+from ecm_attack import ecm_factor
+from factor_cache import default_cache
+from fermat_attack import fermat_factor_sieved
+from lehman_attack import lehman_factor
+from pollard_pm1_attack import pollard_pm1, primes_up_to
+from pollard_rho_attack import brent_rho, is_probable_prime
+
+FactorResult = namedtuple("FactorResult", "p q d method timings")
+
+TRIAL_DIVISION_LIMIT = 100000
+FERMAT_ITERATIONS = 100000
+# Seconds each racing engine may run before it is terminated
+DEFAULT_BUDGETS = {
+    "rho": 60,
+    "pm1": 30,
+    "ecm": 120,
+    "lehman": 20,
+    "boneh_durfee": 60,
+}
+# ECM gets more curves than fit in its budget, so the deadline ends it; sigmas are drawn lazily
+ECM_CURVES = 10**6
+SKIPPED = "skipped"  # What a check returns when it does not apply to the key
+
+def _run_ecm(n):
+    return ecm_factor(n, curves=ECM_CURVES, workers=1)
+
+def _run_lehman(n):
+    result = lehman_factor(n, trial_limit=0)
+    return result[0] if result else None
+
+ENGINES = {
+    "rho": brent_rho,
+    "pm1": pollard_pm1,
+    "ecm": _run_ecm,
+    "lehman": _run_lehman,
+}
+
+SMALL_D_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Small Private Exponent Attack")
+WIENER_PATH = os.path.join(SMALL_D_DIR, "wiener.py")
+_small_d_modules = {}
+
+def _load_small_d(name):
+    """Import a script from the small-d directory (the name has spaces, so it is not a package)."""
+    if SMALL_D_DIR not in sys.path:
+        sys.path.append(SMALL_D_DIR)  # The scripts import each other and repo_root
+    if name not in _small_d_modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(SMALL_D_DIR, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _small_d_modules[name] = module
+    return _small_d_modules[name]
+
+def _load_wiener():
+    return _load_small_d("wiener")
+
+def factor_from_d(n, e, d):
+    """Recover p from a known private exponent (e*d - 1 is a multiple of phi(n))."""
+    k = e * d - 1
+    t = k
+    while t % 2 == 0:
+        t //= 2
+    for _ in range(100):
+        g = random.randint(2, n - 2)
+        x = pow(g, t, n)
+        while x not in (1, n - 1):
+            y = x * x % n
+            if y == 1:
+                return math.gcd(x - 1, n)
+            x = y
+    return None
+
+# --- Cheap checks (run in this process, in order) ---
+
+def _trial_division(n, e):
+    for p in primes_up_to(TRIAL_DIVISION_LIMIT):
+        if n % p == 0 and p < n:
+            return p
+    return None
+
+def _fermat(n, e):
+    result = fermat_factor_sieved(n, max_iterations=FERMAT_ITERATIONS)
+    return result[0] if result and 1 < result[0] < n else None
+
+def _small_d_possible(n, e):
+    # A small d forces e to be about as large as n; skip those attacks for ordinary exponents
+    return e is not None and e.bit_length() >= n.bit_length() - 16
+
+def _wiener_check(n, e):
+    if e is None:
+        return SKIPPED
+    with redirect_stdout(StringIO()):
+        d = _load_wiener().wiener_attack(e, n)
+    return factor_from_d(n, e, d) if d else None
+
+def _extended_wiener_check(n, e):
+    if not _small_d_possible(n, e):
+        return SKIPPED
+    with redirect_stdout(StringIO()):
+        d = _load_small_d("extended_wiener").extended_wiener_attack(e, n, workers=1)
+    return factor_from_d(n, e, d) if d else None
+
+CHEAP_CHECKS = [
+    ("trial_division", _trial_division),
+    ("fermat", _fermat),
+    ("wiener", _wiener_check),
+    ("extended_wiener", _extended_wiener_check),
+]
+
+# --- Racing engines ---
+
+def _run_boneh_durfee(n, e):
+    with redirect_stdout(StringIO()):
+        d = _load_small_d("boneh_durfee").boneh_durfee_attack(e, n)
+    return factor_from_d(n, e, d) if d else None
+
+# Engines that need e as well, raced only when _small_d_possible(n, e)
+KEY_ENGINES = {
+    "boneh_durfee": _run_boneh_durfee,
+}
+
+def _engine_process(name, n, e, connection):
+    random.seed()
+    start = time.time()
+    try:
+        factor = KEY_ENGINES[name](n, e) if name in KEY_ENGINES else ENGINES[name](n)
+    except Exception:
+        factor = None
+    connection.send((factor, time.time() - start))
+    connection.close()
+
+def _race(n, e, engines, budgets, timings):
+    """Run the engines side by side; return (name, factor) of the first success or None.
+
+    Every engine reports through its own pipe, so terminating one in the
+    middle of a send can only garble a pipe that is never read again.
+    """
+    running, started = {}, {}
+    for name in engines:
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_engine_process, args=(name, n, e, writer), daemon=True)
+        process.start()
+        writer.close()  # The child holds the only writer, so its death shows up as EOF
+        running[name], started[name] = (process, reader), time.time()
+
+    def stop(name, status):
+        process, reader = running.pop(name)
+        process.terminate()
+        process.join()
+        reader.close()
+        timings[name] = (status, time.time() - started[name])
+
+    try:
+        while running:
+            now = time.time()
+            for name in list(running):
+                if now - started[name] > budgets[name]:
+                    stop(name, "timeout")
+            if not running:
+                break
+            wait = min(started[name] + budgets[name] for name in running) - now
+            readers = {reader: name for name, (_, reader) in running.items()}
+            for reader in multiprocessing.connection.wait(list(readers), timeout=max(0.01, wait)):
+                name = readers[reader]
+                process, _ = running.pop(name)
+                try:
+                    factor, elapsed = reader.recv()
+                except EOFError:
+                    factor, elapsed = None, time.time() - started[name]  # Died without a result
+                reader.close()
+                process.join()
+                if factor and 1 < factor < n:
+                    timings[name] = ("won", elapsed)
+                    return name, factor
+                timings[name] = ("failed", elapsed)
+        return None
+    finally:
+        for name in list(running):
+            stop(name, "cancelled")
+
+def _private_exponent(e, p, q):
+    # (p - 1)(q - 1) is only phi(n) for a two-prime modulus
+    if e is None or not (is_probable_prime(p) and is_probable_prime(q)):
+        return None
+    try:
+        return pow(e, -1, (p - 1) * (q - 1))
+    except ValueError:
+        return None  # e not invertible
+
+def factor_key(n, e=None, engines=None, budgets=None):
+    """Factor an RSA modulus with whichever engine gets there first.
+
+    engines lists the racing engines (default: all of ENGINES and
+    KEY_ENGINES), budgets overrides DEFAULT_BUDGETS per engine.  Returns a FactorResult; p, q
+    and method are None when every engine failed, and d is filled in
+    when e is given.  timings maps each engine to (status, seconds); a
+    cached key only has a "cache" entry and keeps its original method.
+    """
+    budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+    timings = {}
+    if n < 4 or is_probable_prime(n):
+        return FactorResult(None, None, None, None, timings)
+
+    cache = default_cache()
+    start = time.time()
+    entry = cache.get(n) if cache is not None else None
+    if entry is not None and entry.p is not None:
+        timings["cache"] = ("won", time.time() - start)
+        d = entry.d if entry.e == e and entry.d is not None else _private_exponent(e, entry.p, entry.q)
+        return FactorResult(entry.p, entry.q, d, entry.method, timings)
+
+    winner = None
+    for name, check in CHEAP_CHECKS:
+        start = time.time()
+        factor = check(n, e)
+        if factor == SKIPPED:
+            timings[name] = (SKIPPED, 0.0)
+            continue
+        timings[name] = ("won" if factor else "failed", time.time() - start)
+        if factor:
+            winner = (name, factor)
+            break
+
+    if winner is None:
+        racing = []
+        for name in engines or list(ENGINES) + list(KEY_ENGINES):
+            if name in KEY_ENGINES and not _small_d_possible(n, e):
+                timings[name] = (SKIPPED, 0.0)
+            else:
+                racing.append(name)
+        winner = _race(n, e, racing, budgets, timings)
+    if winner is None:
+        return FactorResult(None, None, None, None, timings)
+
+    method, p = winner
+    p, q = sorted((p, n // p))
+    d = _private_exponent(e, p, q)
+    if cache is not None:
+        _, method_seconds = timings[method]  # The winner's own wall-clock time, as cached_engine records
+        cache.put(n, p, q, d, e if d else None, method, method_seconds)
+    return FactorResult(p, q, d, method, timings)
+
+if __name__ == "__main__":
+    # Ví dụ: thử nhiều modulus, mỗi cái hợp với một engine khác nhau
+    examples = [
+        ("close primes", 1000003 * 1000033, None),
+        ("unbalanced primes", 1000003 * 998244353, None),
+    ]
+    try:
+        wiener = _load_wiener()
+        n_key, e_key = wiener.get_pubkey(os.path.join(os.path.dirname(WIENER_PATH), "key.pub"))
+        examples.append(("small d key.pub", n_key, e_key))
+    except (OSError, ImportError, ValueError):
+        pass
+
+    for label, n, e in examples:
+        print(f"🧪 factor_key on {label}: n = {n}")
+        result = factor_key(n, e)
+        if result.p:
+            print(f"✅ {result.method}: p = {result.p}, q = {result.q}")
+        else:
+            print("❌ All engines failed.")
+        for name, (status, seconds) in result.timings.items():
+            print(f"    {name:15} {status:10} {seconds:.3f} s")
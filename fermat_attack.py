@@ -1,9 +1,13 @@
 import math
+from bisect import bisect_left
+
+from factor_cache import cached_engine
 
 def is_square(n):
     root = int(math.isqrt(n))
     return root * root == n
 
+@cached_engine("fermat", returns="pair")
 def fermat_factor(n):
     a = math.isqrt(n)
     if a * a < n:
@@ -15,6 +19,81 @@ def fermat_factor(n):
     b = math.isqrt(b2)
     return a - b, a + b
 
+# --- Residue-sieved Fermat ---
+
+def _square_table(m):
+    """table[r] == 1 iff r is a square modulo m."""
+    table = bytearray(m)
+    for x in range(m):
+        table[x * x % m] = 1
+    return bytes(table)
+
+# a is only stepped through classes mod 64*63*65 where a*a - n can be a square;
+# the remaining moduli reject b2 values by table lookup before any isqrt.
+STEP_MODULI = (64, 63, 65)
+FILTER_MODULI = (11, 13, 17, 19, 23)
+STEP_MODULUS = math.prod(STEP_MODULI)
+SQUARE_TABLES = {m: _square_table(m) for m in STEP_MODULI + FILTER_MODULI}
+
+def _admissible_offsets(n):
+    """Sorted residues a mod STEP_MODULUS for which a*a - n is a square mod every step modulus."""
+    residues, modulus = [0], 1
+    for m in STEP_MODULI:
+        table = SQUARE_TABLES[m]
+        allowed = [x for x in range(m) if table[(x * x - n) % m]]
+        inverse = pow(modulus, -1, m)
+        # Chinese remaindering of the classes found so far with the new ones
+        residues = [r + modulus * ((x - r) * inverse % m) for r in residues for x in allowed]
+        modulus *= m
+    return sorted(residues)
+
+@cached_engine("fermat", returns="pair")
+def fermat_factor_sieved(n, max_iterations=None, progress=None, progress_interval=1_000_000):
+    """Fermat factorization that only visits admissible a and filters b2 by residue tables.
+
+    b2 = a*a - n is updated incrementally between candidates.  Gives up and
+    returns None after max_iterations candidates; progress(iterations, a) is
+    called every progress_interval candidates.  A prime n yields (1, n).
+    """
+    if n % 2 == 0:
+        return 2, n // 2
+    a0 = math.isqrt(n)
+    if a0 * a0 < n:
+        a0 += 1
+
+    offsets = _admissible_offsets(n)
+    filters = [(m, SQUARE_TABLES[m]) for m in FILTER_MODULI]
+    base = a0 - a0 % STEP_MODULUS
+    index = bisect_left(offsets, a0 % STEP_MODULUS)
+
+    a, b2 = None, None
+    iterations = 0
+    while max_iterations is None or iterations < max_iterations:
+        if index == len(offsets):
+            base += STEP_MODULUS
+            index = 0
+        next_a = base + offsets[index]
+        index += 1
+        if a is None:
+            b2 = next_a * next_a - n
+        else:
+            # (a + k)^2 - a^2 = k * (a + (a + k))
+            b2 += (next_a - a) * (next_a + a)
+        a = next_a
+        iterations += 1
+
+        for m, table in filters:
+            if not table[b2 % m]:
+                break
+        else:
+            b = math.isqrt(b2)
+            if b * b == b2:
+                return a - b, a + b
+
+        if progress is not None and iterations % progress_interval == 0:
+            progress(iterations, a)
+    return None
+
 if __name__ == "__main__":
     # Ví dụ: n = p * q với p và q gần nhau
     p = 1000003
@@ -22,5 +101,5 @@ if __name__ == "__main__":
     n = p * q
 
     print(f"🧪 Fermat attack on n = {n}")
-    p, q = fermat_factor(n)
+    p, q = fermat_factor_sieved(n)
     print(f"✅ Found: p = {p}, q = {q}")
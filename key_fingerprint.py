@@ -0,0 +1,6 @@
+"""Modulus fingerprint shared by the key store and the factor cache."""
+import hashlib
+
+def fingerprint(n):
+    """First 16 bytes of SHA-256 over the big-endian modulus."""
+    return hashlib.sha256(n.to_bytes((n.bit_length() + 7) // 8, "big")).digest()[:16]
@@ -0,0 +1,112 @@
+import math
+
+from factor_cache import cached_engine
+from fermat_attack import SQUARE_TABLES, is_square
+
+# Trial division in front of the square searches stops here by default,
+# so the engines stay usable on moduli far larger than 2^60
+TRIAL_DIVISION_LIMIT = 10**6
+# Hart's multiplier: 480 = 2^5 * 3 * 5 makes s*s mod n more likely to be square
+HART_MULTIPLIER = 480
+
+def _quick_is_square(x):
+    """is_square with a mod 64/63/65 table check in front of the isqrt."""
+    return (SQUARE_TABLES[64][x % 64] and SQUARE_TABLES[63][x % 63]
+            and SQUARE_TABLES[65][x % 65] and is_square(x))
+
+def _cube_root(n):
+    """Integer cube root (Newton's method from above)."""
+    x = 1 << -(-n.bit_length() // 3)
+    while True:
+        y = (2 * x + n // (x * x)) // 3
+        if y >= x:
+            return x
+        x = y
+
+def _trial_division(n, limit):
+    if n % 2 == 0:
+        return 2
+    for p in range(3, limit + 1, 2):
+        if n % p == 0:
+            return p
+    return None
+
+def _split(n, d):
+    return min(d, n // d), max(d, n // d)
+
+@cached_engine("lehman", returns="pair")
+def lehman_factor(n, multipliers=None, trial_limit=None):
+    """Lehman's method: look for a*a - 4kn = b*b with a in a short window above sqrt(4kn).
+
+    multipliers is the k schedule (default 1 .. n^(1/3)).  With the default
+    schedule and trial division up to n^(1/3) the method is exact: None means
+    n is prime.  Returns (p, q) or None.
+    """
+    if n < 4:
+        return None
+    cube_root = _cube_root(n)
+    if trial_limit is None:
+        trial_limit = min(cube_root, TRIAL_DIVISION_LIMIT)
+    d = _trial_division(n, trial_limit)
+    if d is not None and d < n:
+        return _split(n, d)
+    if multipliers is None:
+        multipliers = range(1, cube_root + 1)
+
+    sixth_root = math.exp(math.log(n) / 6)
+    for k in multipliers:
+        four_kn = 4 * k * n
+        a = math.isqrt(four_kn)
+        if a * a < four_kn:
+            a += 1
+        a_max = a + int(sixth_root / (4 * math.sqrt(k))) + 1
+        b2 = a * a - four_kn
+        while a <= a_max:
+            if _quick_is_square(b2):
+                d = math.gcd(a + math.isqrt(b2), n)
+                if 1 < d < n:
+                    return _split(n, d)
+            b2 += 2 * a + 1
+            a += 1
+    return None
+
+@cached_engine("hart", returns="pair")
+def hart_factor(n, multipliers=None, trial_limit=None):
+    """Hart's one-line factoring: s = ceil(sqrt(n*i)), test whether s*s mod n is a square.
+
+    multipliers is the i schedule (default HART_MULTIPLIER * 1 .. n^(1/3)).
+    Heuristic O(n^(1/3)); returns (p, q) or None when the schedule runs out.
+    """
+    if n < 4:
+        return None
+    cube_root = _cube_root(n)
+    if trial_limit is None:
+        trial_limit = min(cube_root, TRIAL_DIVISION_LIMIT)
+    d = _trial_division(n, trial_limit)
+    if d is not None and d < n:
+        return _split(n, d)
+    if multipliers is None:
+        multipliers = range(HART_MULTIPLIER, HART_MULTIPLIER * (cube_root + 1), HART_MULTIPLIER)
+
+    for i in multipliers:
+        ni = n * i
+        s = math.isqrt(ni)
+        if s * s < ni:
+            s += 1
+        m = s * s % n
+        if _quick_is_square(m):
+            d = math.gcd(s - math.isqrt(m), n)
+            if 1 < d < n:
+                return _split(n, d)
+    return None
+
+if __name__ == "__main__":
+    # Ví dụ: p và q không quá gần nhau - Fermat sẽ chậm
+    p = 1000003
+    q = 1700021
+    n = p * q
+
+    print(f"🧪 Lehman attack on n = {n}")
+    print(f"✅ Found: {lehman_factor(n)}")
+    print(f"🧪 Hart one-line attack on n = {n}")
+    print(f"✅ Found: {hart_factor(n)}")
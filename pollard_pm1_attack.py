@@ -0,0 +1,116 @@
+import math
+from functools import lru_cache
+
+from factor_cache import cached_engine
+
+@lru_cache(maxsize=4)
+def prime_sieve(limit):
+    """flags[i] == 1 iff i is prime, for 0 <= i <= limit."""
+    flags = bytearray([1]) * (limit + 1)
+    flags[0:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(limit) + 1):
+        if flags[i]:
+            flags[i*i::i] = bytearray(len(range(i*i, limit + 1, i)))
+    return bytes(flags)
+
+@lru_cache(maxsize=4)
+def primes_up_to(limit):
+    flags = prime_sieve(limit)
+    return tuple(i for i in range(2, limit + 1) if flags[i])
+
+def prime_power_exponents(B1):
+    """Largest power of every prime p <= B1 that is still <= B1."""
+    exponents = []
+    for p in primes_up_to(B1):
+        q = p
+        while q * p <= B1:
+            q *= p
+        exponents.append(q)
+    return exponents
+
+def _stage1(n, a, B1, batch):
+    """a^(product of prime powers <= B1), with one pow and one gcd per batch of primes."""
+    exponents = prime_power_exponents(B1)
+    for i in range(0, len(exponents), batch):
+        block = exponents[i:i+batch]
+        a_next = pow(a, math.prod(block), n)
+        g = math.gcd(a_next - 1, n)
+        if g == n:
+            # Too many primes at once: redo this block one prime power at a time
+            for q in block:
+                a_next = pow(a, q, n)
+                g = math.gcd(a_next - 1, n)
+                if g != 1:
+                    return a_next, g
+                a = a_next
+            return a, g
+        if g != 1:
+            return a_next, g
+        a = a_next
+    return a, 1
+
+def _stage2(n, a, B1, B2, batch):
+    """Standard continuation: one prime q in (B1, B2] in p - 1, reached by prime gaps."""
+    flags = prime_sieve(B2)
+    q = B1 + 1
+    while q <= B2 and not flags[q]:
+        q += 1
+    if q > B2:
+        return 1
+    b = pow(a, q, n)
+    gap_powers = {}
+    acc = 1
+    count = 0
+    previous = q
+    for q in range(q, B2 + 1):
+        if not flags[q]:
+            continue
+        gap = q - previous
+        if gap:
+            if gap not in gap_powers:
+                gap_powers[gap] = pow(a, gap, n)
+            b = b * gap_powers[gap] % n
+        previous = q
+        acc = acc * (b - 1) % n
+        count += 1
+        if count % batch == 0:
+            g = math.gcd(acc, n)
+            if g != 1:
+                return g
+    return math.gcd(acc, n)
+
+@cached_engine("pm1")
+def pollard_pm1(n, B1=100000, B2=None, base=2, batch=256):
+    """Pollard p - 1: finds p when p - 1 is B1-smooth except for one prime <= B2.
+
+    B2 defaults to 100 * B1 (B2 <= B1 skips stage 2).  gcds are batched
+    over `batch` primes.  Returns a non-trivial factor or None.
+    """
+    if n % 2 == 0:
+        return 2
+    if B2 is None:
+        B2 = 100 * B1
+    g = math.gcd(base, n)
+    if 1 < g < n:
+        return g
+
+    a, g = _stage1(n, base, B1, batch)
+    if 1 < g < n:
+        return g
+    if g == n or B2 <= B1:
+        return None
+    g = _stage2(n, a, B1, B2, batch)
+    return g if 1 < g < n else None
+
+if __name__ == "__main__":
+    # Ví dụ: p - 1 = 2 * 3^2 * 5 * 7 * ... * 29 * 1993 (1000-smooth trừ 1993 <= B2)
+    p = 2 * 3**2 * 5 * 7 * 11 * 13 * 17 * 19 * 23 * 29 * 1993 + 1
+    q = 1000000000000000003
+    n = p * q
+
+    print(f"🧪 Pollard p-1 attack on n = {n}")
+    d = pollard_pm1(n, B1=1000, B2=10000)
+    if d:
+        print(f"✅ Found factor: d = {d}, n/d = {n // d}")
+    else:
+        print("❌ Attack failed.")
@@ -1,10 +1,18 @@
+import math
+import multiprocessing
+import os
+import queue
 import random
+import time
+
+from factor_cache import cached_engine
 
 def gcd(a, b):
     while b:
         a, b = b, a % b
     return a
 
+@cached_engine("pollard_rho")
 def pollards_rho(n):
     if n % 2 == 0:
         return 2
@@ -21,6 +29,154 @@ def pollards_rho(n):
             return None
     return d
 
+# --- Brent variant with batched gcd ---
+
+def _brent_walk(n, c, y, m, max_iterations=None, should_stop=None):
+    """One Brent cycle search for f(x) = x^2 + c from y.
+
+    |x - y| values are multiplied into q and gcd(q, n) is taken once per
+    m steps; if that batch overshoots to n, the batch is replayed one step
+    at a time.  Returns a divisor of n (n itself means this walk failed)
+    or None if max_iterations was exceeded or should_stop() turned true
+    (checked every m steps).
+    """
+    g = r = q = 1
+    x = ys = y
+    while g == 1:
+        x = y
+        # The advance is as long as the batches that follow: check the flag every m steps here too
+        for start in range(0, r, m):
+            for _ in range(min(m, r - start)):
+                y = (y * y + c) % n
+            if should_stop is not None and should_stop():
+                return None
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for _ in range(min(m, r - k)):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+            g = math.gcd(q, n)
+            k += m
+            if should_stop is not None and g == 1 and should_stop():
+                return None
+        r *= 2
+        if max_iterations is not None and r > max_iterations and g == 1:
+            return None
+    if g == n:
+        # Backtrack through the last batch
+        while True:
+            ys = (ys * ys + c) % n
+            g = math.gcd(abs(x - ys), n)
+            if g > 1:
+                break
+    return g
+
+@cached_engine("brent_rho")
+def brent_rho(n, m=128, max_restarts=None, max_iterations=None):
+    """Pollard rho with Brent's cycle finding; restarts with a new c when a walk fails.
+
+    max_iterations bounds each walk, max_restarts the number of walks
+    (None = keep trying).  Returns a non-trivial factor, or None.
+    """
+    if n % 2 == 0:
+        return 2
+    attempts = 0
+    while max_restarts is None or attempts <= max_restarts:
+        attempts += 1
+        c = random.randint(1, n - 3)  # c = 0 and c = -2 give degenerate walks
+        d = _brent_walk(n, c, random.randint(0, n - 1), m, max_iterations)
+        if d is not None and d != n:
+            return d
+    return None
+
+# --- Parallel walks ---
+
+def _rho_worker(n, seed, m, deadline, stop_event, results):
+    random.seed(seed)
+    should_stop = lambda: stop_event.is_set() or (deadline is not None and time.time() > deadline)
+    while not should_stop():
+        c = random.randint(1, n - 3)
+        d = _brent_walk(n, c, random.randint(0, n - 1), m, should_stop=should_stop)
+        if d is not None and d != n:
+            results.put(d)
+            return
+
+@cached_engine("parallel_rho")
+def parallel_rho(n, workers=None, deadline=None, m=128):
+    """Run independent Brent walks (different c and start) on composite n in `workers` processes.
+
+    The first non-trivial factor wins; the other walks see the stop event
+    within one gcd batch and exit.  deadline is in seconds from now.
+    Returns the factor, or None if the deadline passed first.
+    """
+    if n % 2 == 0:
+        return 2
+    workers = workers or os.cpu_count() or 1
+    end_time = time.time() + deadline if deadline is not None else None
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_rho_worker, args=(n, random.getrandbits(64), m, end_time, stop_event, results), daemon=True)
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        return results.get(timeout=deadline)
+    except queue.Empty:
+        return None
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join()
+
+# --- Full factorization ---
+
+SMALL_PRIMES = [p for p in range(2, 1000) if all(p % d for d in range(2, math.isqrt(p) + 1))]
+MILLER_RABIN_BASES = SMALL_PRIMES[:12]  # Deterministic below 3.3 * 10^24
+
+def is_probable_prime(n, rounds=8):
+    """Miller-Rabin: deterministic bases, plus random ones for n beyond their proven range."""
+    if n < 2:
+        return False
+    for p in MILLER_RABIN_BASES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    bases = list(MILLER_RABIN_BASES)
+    if n >= 3317044064679887385961981:
+        bases += [random.randint(2, n - 2) for _ in range(rounds)]
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def factorize(n):
+    """Sorted list of the prime factors of n, with multiplicity."""
+    factors = []
+    for p in SMALL_PRIMES:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        n = stack.pop()
+        if is_probable_prime(n):
+            factors.append(n)
+            continue
+        d = brent_rho(n)
+        stack += [d, n // d]
+    return sorted(factors)
+
 if __name__ == "__main__":
     # Ví dụ: n = p * q với p và q bất kỳ
     p = 1000003
@@ -28,8 +184,9 @@ if __name__ == "__main__":
     n = p * q
 
     print(f"🧪 Pollard Rho attack on n = {n}")
-    d = pollards_rho(n)
+    d = brent_rho(n)
     if d:
         print(f"✅ Found factor: d = {d}, n/d = {n // d}")
     else:
         print("❌ Attack failed.")
+    print(f"✅ Prime factorization: {factorize(n)}")
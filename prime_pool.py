@@ -0,0 +1,154 @@
+"""Background pool of pre-generated primes for low-latency RSA key issuance.
+
+Worker processes search for primes of the configured sizes ahead of time
+and park them in a bounded per-size queue, so RSA.generate_keys(pool=...)
+only has to pop a ready pair.  The queue is topped up whenever it drops
+below its low-water mark and can be persisted to disk between runs.
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sympy import isprime
+
+from RSA import _generate_prime_worker, generate_large_prime
+
+class PrimePool:
+    """Bounded, self-refilling store of ready primes keyed by bit size.
+
+    capacity   -- maximum number of primes kept (ready + in progress) per size
+    low_water  -- when fewer primes than this are ready or in progress, a refill is started
+    refill_batch -- primes requested per refill (default: up to capacity)
+    path       -- optional file the pool is loaded from and saved to
+    """
+
+    def __init__(self, sizes=(512,), capacity=16, low_water=4, refill_batch=None, workers=None, path=None):
+        if not 0 <= low_water <= capacity:
+            raise ValueError("low_water must be between 0 and capacity")
+        self.capacity = capacity
+        self.low_water = low_water
+        self.refill_batch = refill_batch or capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self._ready = {bits: deque() for bits in sizes}
+        self._pending = {bits: 0 for bits in sizes}
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._closed = False
+        if path and os.path.exists(path):
+            self.load(path)
+        for bits in sizes:
+            self.refill(bits)
+
+    # --- Queue maintenance ---
+
+    def refill(self, bits=None, count=None):
+        """Queue prime searches for one size (or all sizes), never exceeding capacity."""
+        sizes = [bits] if bits is not None else list(self._ready)
+        for size in sizes:
+            with self._lock:
+                if self._closed:
+                    return
+                room = self.capacity - len(self._ready[size]) - self._pending[size]
+                jobs = max(0, min(room, count if count is not None else self.refill_batch))
+                self._pending[size] += jobs
+            for _ in range(jobs):
+                future = self._executor.submit(_generate_prime_worker, size)
+                future.add_done_callback(lambda f, size=size: self._on_prime(size, f))
+
+    def _on_prime(self, bits, future):
+        with self._lock:
+            self._pending[bits] -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._ready[bits].append(future.result())
+            self.generated += 1
+
+    def _check_low_water(self, bits):
+        with self._lock:
+            needs_refill = len(self._ready[bits]) + self._pending[bits] < self.low_water
+        if needs_refill:
+            self.refill(bits)
+
+    # --- Consumers ---
+
+    def take(self, bits):
+        """Return a prime of `bits` bits, generating one in-line if none is ready."""
+        if bits not in self._ready:
+            raise ValueError(f"Pool is not configured for {bits}-bit primes")
+        with self._lock:
+            prime = self._ready[bits].popleft() if self._ready[bits] else None
+            if prime is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._check_low_water(bits)
+        return prime if prime is not None else generate_large_prime(bits)
+
+    def take_pair(self, bits):
+        """Return two distinct primes of `bits` bits."""
+        p = self.take(bits)
+        q = self.take(bits)
+        while p == q:
+            q = self.take(bits)
+        return p, q
+
+    def level(self, bits):
+        """Number of primes of `bits` bits ready right now."""
+        with self._lock:
+            return len(self._ready[bits])
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "generated": self.generated,
+                "ready": {bits: len(primes) for bits, primes in self._ready.items()},
+                "pending": dict(self._pending),
+            }
+
+    # --- Persistence ---
+
+    def load(self, path):
+        """Add primes saved by save(); unknown sizes and non-primes are skipped."""
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                bits, prime = line.split()
+                bits, prime = int(bits), int(prime, 16)
+                if prime.bit_length() != bits or not isprime(prime):
+                    continue
+                with self._lock:
+                    if bits in self._ready and len(self._ready[bits]) < self.capacity:
+                        self._ready[bits].append(prime)
+
+    def save(self, path=None):
+        """Write the ready primes as '<bits> <hex prime>' lines (atomically replaced)."""
+        path = path or self.path
+        with self._lock:
+            lines = [f"{bits} {prime:x}\n" for bits, primes in self._ready.items() for prime in primes]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Stop the workers (queued searches are cancelled) and save the pool if it has a path."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.path:
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,185 @@
+"""Compact binary store for many RSA keys, loaded lazily through mmap.
+
+Layout (all integers big-endian):
+
+    header   magic "RKS1", version u16, reserved u16, count u32,
+             id index offset u64, fingerprint index offset u64  (32 bytes)
+    records  flags u8, field count u8, one u16 byte length per field,
+             then the fields: n, e[, d, p, q, dP, dQ, qInv]
+    id index           count x (record offset u64, record length u32)
+    fingerprint index  count x (fingerprint 16 bytes, key id u32), sorted
+
+Key ids are positions in the id index, so a key is found by id with one
+index read; fingerprints are found by binary search over the sorted
+fingerprint index.  Only the requested record is decoded.
+"""
+import mmap
+import os
+import struct
+
+from key_fingerprint import fingerprint
+from RSA import PrivateKey, PublicKey
+
+MAGIC = b"RKS1"
+VERSION = 1
+HEADER = struct.Struct(">4sHHIQQ4x")
+ID_ENTRY = struct.Struct(">QI")
+FP_ENTRY = struct.Struct(">16sI")
+FLAG_PRIVATE = 0x01
+
+def _encode_record(key):
+    # Go by the fields, not the class: RSA.py run as a script has its own PrivateKey
+    if len(key) == len(PrivateKey._fields):
+        flags, fields = FLAG_PRIVATE, list(key)
+    else:
+        flags, fields = 0, [key.n, key.e]
+    raw = [value.to_bytes((value.bit_length() + 7) // 8 or 1, "big") for value in fields]
+    header = struct.pack(f">BB{len(raw)}H", flags, len(raw), *(len(field) for field in raw))
+    return header + b"".join(raw)
+
+def _decode_record(data):
+    flags, field_count = data[0], data[1]
+    lengths = struct.unpack_from(f">{field_count}H", data, 2)
+    offset = 2 + 2 * field_count
+    fields = []
+    for length in lengths:
+        fields.append(int.from_bytes(data[offset:offset+length], "big"))
+        offset += length
+    if flags & FLAG_PRIVATE:
+        return PrivateKey(*fields)
+    return PublicKey(*fields)
+
+def _write_indexes(f, id_entries, fp_entries):
+    """Write both indexes at the current position and patch the header."""
+    id_index_offset = f.tell()
+    for entry in id_entries:
+        f.write(ID_ENTRY.pack(*entry))
+    fp_index_offset = f.tell()
+    for entry in sorted(fp_entries):
+        f.write(FP_ENTRY.pack(*entry))
+    f.truncate()
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, 0, len(id_entries), id_index_offset, fp_index_offset))
+
+def write_keystore(path, keys):
+    """Write PrivateKey/PublicKey objects to a new store; key ids follow the iteration order."""
+    id_entries, fp_entries = [], []
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        for key_id, key in enumerate(keys):
+            record = _encode_record(key)
+            id_entries.append((f.tell(), len(record)))
+            fp_entries.append((fingerprint(key.n), key_id))
+            f.write(record)
+        _write_indexes(f, id_entries, fp_entries)
+
+def append_keys(path, keys):
+    """Append keys to an existing store (creating it if missing) and return their ids."""
+    if not os.path.exists(path):
+        keys = list(keys)
+        write_keystore(path, keys)
+        return list(range(len(keys)))
+
+    with open(path, "r+b") as f:
+        magic, version, _, count, id_index_offset, fp_index_offset = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a key store")
+        f.seek(id_index_offset)
+        id_entries = [ID_ENTRY.unpack(f.read(ID_ENTRY.size)) for _ in range(count)]
+        f.seek(fp_index_offset)
+        fp_entries = [FP_ENTRY.unpack(f.read(FP_ENTRY.size)) for _ in range(count)]
+
+        # New records overwrite the old indexes, which are rewritten after them
+        f.seek(id_index_offset)
+        new_ids = []
+        for key in keys:
+            key_id = len(id_entries)
+            record = _encode_record(key)
+            id_entries.append((f.tell(), len(record)))
+            fp_entries.append((fingerprint(key.n), key_id))
+            f.write(record)
+            new_ids.append(key_id)
+        _write_indexes(f, id_entries, fp_entries)
+    return new_ids
+
+class KeyStore:
+    """Read-only, memory-mapped view of a key store file."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        magic, version, _, self._count, self._id_index, self._fp_index = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a key store")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key_id):
+        """Decode the key with the given id."""
+        if not 0 <= key_id < self._count:
+            raise IndexError(f"No key with id {key_id}")
+        offset, length = ID_ENTRY.unpack_from(self._map, self._id_index + key_id * ID_ENTRY.size)
+        return _decode_record(self._map[offset:offset+length])
+
+    def __iter__(self):
+        for key_id in range(self._count):
+            yield self[key_id]
+
+    def key_id(self, fp):
+        """Id of the key with fingerprint fp (bytes or hex string), or None."""
+        if isinstance(fp, str):
+            fp = bytes.fromhex(fp)
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            entry_fp, key_id = FP_ENTRY.unpack_from(self._map, self._fp_index + mid * FP_ENTRY.size)
+            if entry_fp == fp:
+                return key_id
+            if entry_fp < fp:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def by_fingerprint(self, fp):
+        key_id = self.key_id(fp)
+        if key_id is None:
+            raise KeyError(fp)
+        return self[key_id]
+
+    def find(self, n):
+        """Key whose modulus is n, or None."""
+        key_id = self.key_id(fingerprint(n))
+        return None if key_id is None else self[key_id]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+if __name__ == "__main__":
+    # Round trip through the RSA.py menu: generate a key, save it, read it back
+    import subprocess
+    import sys
+    import tempfile
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "RSA.py")
+    with tempfile.TemporaryDirectory() as workdir:
+        subprocess.run([sys.executable, script], input="1\n4\n6\n", text=True,
+                       cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+        with KeyStore(os.path.join(workdir, "keys.rks")) as store:
+            key = store[0]
+    assert isinstance(key, PrivateKey), "private key dropped on save"
+    assert key.n == key.p * key.q and pow(pow(42, key.e, key.n), key.d, key.n) == 42
+    print(f"Key store round trip OK: private key with {key.n.bit_length()}-bit n.")
@@ -0,0 +1,415 @@
+"""Self-initializing quadratic sieve (SIQS) for moduli of roughly 30 to 70 digits.
+
+Relations (A*x + B)^2 = A*Q(x) (mod kN) are collected by sieving
+Q(x) = A*x^2 + 2*B*x + C over [-M, M) with NumPy: every factor-base prime
+adds its rounded log2 at its two roots, and positions whose total comes
+close to log2|Q| are trial divided.  One A = q_1*...*q_s serves 2^(s-1)
+polynomials whose B values are visited in Gray-code order, so moving to
+the next polynomial shifts every root by one precomputed vector.  A
+family of polynomials is one task for the process pool.
+
+Relations with one large prime left over are kept and paired up.  Once
+there are more relations than factor-base primes, elimination over GF(2)
+on bit-packed rows finds subsets whose product is a square, and
+gcd(X - Y, n) splits n.
+"""
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from factor_cache import cached_engine
+from pollard_pm1_attack import primes_up_to
+from pollard_rho_attack import brent_rho, is_probable_prime
+
+# (up to this many digits, factor base size, sieve half-width M)
+SIQS_PARAMETERS = [
+    (30, 150, 32768),
+    (36, 300, 32768),
+    (40, 450, 65536),
+    (44, 650, 65536),
+    (48, 900, 65536),
+    (52, 1300, 65536),
+    (56, 1900, 98304),
+    (60, 2600, 131072),
+    (64, 3600, 163840),
+    (68, 5000, 196608),
+    (72, 7000, 229376),
+    (80, 12000, 262144),
+]
+MULTIPLIERS = [1, 3, 5, 7, 11, 13, 15, 17, 19, 21, 23, 29, 31, 33, 35, 37, 39, 41, 43, 47,
+               51, 53, 55, 57, 59, 61, 65, 67, 69, 71, 73, 77, 79, 83, 85, 87, 89, 91, 93, 95, 97]
+SMALL_PRIME_LIMIT = 30      # Primes below this are not sieved, only trial divided
+THRESHOLD_SLACK = 2.1       # Sieve threshold: log2|Q| - THRESHOLD_SLACK * log2(largest prime)
+LARGE_PRIME_MULTIPLIER = 64 # Keep relations whose cofactor is a prime below this * largest prime
+EXTRA_RELATIONS = 24        # Relations beyond the factor base size before the linear algebra
+MIN_BITS = 64               # Smaller moduli go to Brent's rho
+
+# --- Factor base ---
+
+def _sqrt_mod(a, p):
+    """Square root of a quadratic residue a modulo an odd prime p (Tonelli-Shanks)."""
+    a %= p
+    if a == 0:
+        return 0
+    if p % 4 == 3:
+        return pow(a, (p + 1) // 4, p)
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q //= 2
+        s += 1
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    m, c, t, r = s, pow(z, q, p), pow(a, q, p), pow(a, (q + 1) // 2, p)
+    while t != 1:
+        i, t2 = 1, t * t % p
+        while t2 != 1:
+            t2 = t2 * t2 % p
+            i += 1
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c, t, r = i, b * b % p, t * b * b % p, r * b % p
+    return r
+
+def choose_multiplier(n):
+    """Knuth-Schroeppel: the small k that makes kN have the most small primes as residues."""
+    best, best_score = 1, -math.inf
+    for k in MULTIPLIERS:
+        kn = k * n
+        score = -0.5 * math.log(k)
+        if kn % 8 == 1:
+            score += 2 * math.log(2)
+        elif kn % 8 == 5:
+            score += math.log(2)
+        elif kn % 4 == 3:
+            score += 0.5 * math.log(2)
+        for p in primes_up_to(1000)[1:]:
+            if k % p == 0:
+                score += math.log(p) / p
+            elif pow(kn % p, (p - 1) // 2, p) == 1:
+                score += 2 * math.log(p) / (p - 1)
+        if score > best_score:
+            best, best_score = k, score
+    return best
+
+def build_factor_base(n, kn, size):
+    """(primes, square roots of kN, rounded log2) of the first `size` primes with (kN/p) != -1.
+
+    Returns a prime instead when one of them divides n.
+    """
+    limit = max(1000, int(size * math.log(size) * 3))
+    while True:
+        primes, roots = [2], [1]
+        for p in primes_up_to(limit)[1:]:
+            residue = kn % p
+            if residue == 0:
+                if n % p == 0:
+                    return p
+                primes.append(p)
+                roots.append(0)
+            elif pow(residue, (p - 1) // 2, p) == 1:
+                primes.append(p)
+                roots.append(_sqrt_mod(residue, p))
+            if len(primes) == size:
+                primes = np.array(primes, dtype=np.int64)
+                logs = np.round(np.log2(primes)).astype(np.int16)
+                return primes, np.array(roots, dtype=np.int64), logs
+        limit *= 2
+
+# --- Sieving (runs in the workers) ---
+
+_context = None
+
+def _init_siqs_worker(n, kn, primes, roots, logs, M):
+    global _context
+    pmax = int(primes[-1])
+    threshold = math.log2(M) + kn.bit_length() / 2 - 0.5 - THRESHOLD_SLACK * math.log2(pmax)
+    # A = q_1 * ... * q_s is built from primes around 2000 (or the middle of a small factor base)
+    target = math.isqrt(2 * kn) // M
+    low = int(np.searchsorted(primes, 1000))
+    high = int(np.searchsorted(primes, 4000))
+    if high - low < 20:
+        low, high = len(primes) // 3, 2 * len(primes) // 3
+    _context = {
+        "n": n, "kn": kn, "M": M, "primes": primes, "roots": roots, "logs": logs,
+        "sieve_from": int(np.searchsorted(primes, SMALL_PRIME_LIMIT)),
+        "threshold": int(threshold), "large_prime_bound": pmax * LARGE_PRIME_MULTIPLIER,
+        "target": target, "a_range": (max(low, 1), high),
+    }
+
+def _choose_a(rng):
+    """Random A close to sqrt(2kN)/M as a product of distinct factor-base primes."""
+    ctx = _context
+    primes, target = ctx["primes"], ctx["target"]
+    low, high = ctx["a_range"]
+    typical = math.log(int(primes[(low + high) // 2]))
+    s = max(2, round(math.log(target) / typical))
+    while True:
+        indexes = rng.sample(range(low, high), s - 1)
+        partial = math.prod(int(primes[i]) for i in indexes)
+        # Last prime: whichever brings A nearest the target
+        wanted = target // partial
+        last = int(np.searchsorted(primes, wanted))
+        candidates = [i for i in (last - 1, last, last + 1)
+                      if 0 < i < len(primes) and i not in indexes and int(primes[i]) > 2]
+        if not candidates:
+            continue
+        best = min(candidates, key=lambda i: abs(partial * int(primes[i]) - target))
+        indexes.append(best)
+        if ctx["roots"][indexes].all():  # q must not divide kN
+            return sorted(indexes)
+
+def _trial_divide(value, prime_indexes, a_indexes):
+    """Divide value by the given factor-base primes; returns (factor indexes with multiplicity, cofactor)."""
+    primes = _context["primes"]
+    factors = []
+    if value < 0:
+        factors.append(0)
+        value = -value
+    for i in prime_indexes + a_indexes:
+        p = int(primes[i])
+        while value % p == 0:
+            value //= p
+            factors.append(i + 1)
+    for i in a_indexes:
+        factors.append(i + 1)  # (A*x + B)^2 - kN = A * Q(x)
+    return factors, value
+
+def _sieve_family(seed):
+    """Sieve all 2^(s-1) polynomials of one random A; returns (full relations, partial relations).
+
+    A relation is (u, factor indexes, large prime) with u^2 = product (mod n);
+    index 0 stands for -1 and index i + 1 for primes[i].
+    """
+    ctx = _context
+    kn, M = ctx["kn"], ctx["M"]
+    primes, roots, logs = ctx["primes"], ctx["roots"], ctx["logs"]
+    rng = random.Random(seed)
+
+    a_indexes = _choose_a(rng)
+    A = math.prod(int(primes[i]) for i in a_indexes)
+    # B_l = (A/q_l) * (sqrt(kN) * (A/q_l)^-1 mod q_l): B_l^2 = kN mod q_l and 0 mod the other q
+    B_parts = []
+    for i in a_indexes:
+        q = int(primes[i])
+        gamma = int(roots[i]) * pow(A // q, -1, q) % q
+        if gamma > q // 2:
+            gamma = q - gamma
+        B_parts.append(A // q * gamma)
+
+    prime_list = [int(p) for p in primes]
+    ainv = np.array([pow(A % p, -1, p) if A % p else 0 for p in prime_list], dtype=np.int64)
+    bainv2 = [np.array([2 * (Bl % p) % p for p in prime_list], dtype=np.int64) * ainv % primes
+              for Bl in B_parts]
+
+    in_a = np.zeros(len(primes), dtype=bool)
+    in_a[a_indexes] = True
+    sieved = np.arange(len(primes)) >= ctx["sieve_from"]
+    sieved &= ~in_a
+
+    # First polynomial of the Gray code: B = B_last - sum(other B_l)
+    B = B_parts[-1] - sum(B_parts[:-1])
+    B_mod = np.array([B % p for p in prime_list], dtype=np.int64)
+    root1 = ainv * ((roots - B_mod) % primes) % primes
+    root2 = ainv * ((-roots - B_mod) % primes) % primes
+    signs = [-1] * (len(B_parts) - 1)
+
+    full, partial = [], []
+    sieve_indexes = np.nonzero(sieved)[0]
+    sieve_primes = [prime_list[i] for i in sieve_indexes]
+    sieve_logs = [int(logs[i]) for i in sieve_indexes]
+    for poly in range(1 << (len(B_parts) - 1)):
+        if poly:
+            # Gray code step: flip the sign of B_l for l = number of trailing zeros of poly
+            l = (poly & -poly).bit_length() - 1
+            signs[l] = -signs[l]
+            B += 2 * signs[l] * B_parts[l]
+            root1 = (root1 - signs[l] * bainv2[l]) % primes
+            root2 = (root2 - signs[l] * bainv2[l]) % primes
+        C = (B * B - kn) // A
+
+        sieve = np.zeros(2 * M, dtype=np.int16)
+        start1 = ((root1 + M) % primes)[sieve_indexes].tolist()
+        start2 = ((root2 + M) % primes)[sieve_indexes].tolist()
+        for p, logp, r1, r2 in zip(sieve_primes, sieve_logs, start1, start2):
+            sieve[r1::p] += logp
+            if r2 != r1:
+                sieve[r2::p] += logp
+
+        candidates = np.nonzero(sieve > ctx["threshold"])[0]
+        if len(candidates) == 0:
+            continue
+        # Which factor-base primes divide Q(x) at each candidate: x must sit on one of their roots
+        offsets = candidates[:, None] - M
+        hits = ((offsets - root1) % primes == 0) | ((offsets - root2) % primes == 0)
+        hits[:, in_a] = False
+        for row, j in enumerate(candidates.tolist()):
+            x = j - M
+            factors, cofactor = _trial_divide((A * x + 2 * B) * x + C, np.nonzero(hits[row])[0].tolist(), a_indexes)
+            u = A * x + B
+            if cofactor == 1:
+                full.append((u, factors, 1))
+            elif cofactor < ctx["large_prime_bound"]:
+                partial.append((u, factors, cofactor))
+    return full, partial
+
+# --- Linear algebra over GF(2) ---
+
+def _square_subsets(relations, columns):
+    """Yield index lists of relations whose exponent vectors sum to zero mod 2.
+
+    Rows are bit-packed into uint64 words: the exponent parities, then an
+    identity block that records which relations were added together.
+    """
+    rows = len(relations)
+    words = (columns + rows + 63) // 64
+    matrix = np.zeros((rows, words), dtype=np.uint64)
+    for r, (_, factors, _) in enumerate(relations):
+        parity = {}
+        for i in factors:
+            parity[i] = parity.get(i, 0) ^ 1
+        bits = [i for i, odd in parity.items() if odd] + [columns + r]
+        for bit in bits:
+            matrix[r, bit >> 6] ^= np.uint64(1 << (bit & 63))
+
+    used = np.zeros(rows, dtype=bool)
+    for col in range(columns):
+        word, bit = col >> 6, np.uint64(1 << (col & 63))
+        has_bit = (matrix[:, word] & bit) != 0
+        candidates = np.nonzero(has_bit & ~used)[0]
+        if len(candidates) == 0:
+            continue
+        pivot = candidates[0]
+        used[pivot] = True
+        has_bit[pivot] = False
+        matrix[has_bit] ^= matrix[pivot]
+
+    # Unused rows are now zero on the exponent part; their identity part names the subset
+    for r in np.nonzero(~used)[0]:
+        subset = []
+        for col in range(columns, columns + rows):
+            if int(matrix[r, col >> 6]) >> (col & 63) & 1:
+                subset.append(col - columns)
+        yield subset
+
+def _split_from_subset(n, primes, relations, subset):
+    X, Y = 1, 1
+    exponents = {}
+    for r in subset:
+        u, factors, large = relations[r]
+        X = X * u % n
+        Y = Y * large % n
+        for i in factors:
+            exponents[i] = exponents.get(i, 0) + 1
+    for i, e in exponents.items():
+        if i:
+            Y = Y * pow(int(primes[i - 1]), e // 2, n) % n
+    g = math.gcd(X - Y, n)
+    return g if 1 < g < n else None
+
+# --- Driver ---
+
+def siqs_parameters(n):
+    """(factor base size, sieve half-width M) for n from SIQS_PARAMETERS."""
+    digits = len(str(n))
+    for max_digits, size, M in SIQS_PARAMETERS:
+        if digits <= max_digits:
+            return size, M
+    return SIQS_PARAMETERS[-1][1:]
+
+@cached_engine("siqs")
+def siqs_factor(n, workers=None, fb_size=None, sieve_size=None, progress=None):
+    """Split n with the self-initializing quadratic sieve; returns a non-trivial factor or None.
+
+    fb_size and sieve_size (M) override SIQS_PARAMETERS.  Polynomial
+    families are sieved across `workers` processes (default: one per
+    CPU; workers=1 stays in this process).  progress(relations, needed)
+    is called whenever a family has been merged.
+    """
+    if n % 2 == 0:
+        return 2
+    root = math.isqrt(n)
+    if root * root == n:
+        return root
+    if is_probable_prime(n):
+        return None
+    if n.bit_length() < MIN_BITS:
+        return brent_rho(n)
+
+    default_size, default_M = siqs_parameters(n)
+    size, M = fb_size or default_size, sieve_size or default_M
+    k = choose_multiplier(n)
+    kn = k * n
+    base = build_factor_base(n, kn, size)
+    if isinstance(base, int):
+        return base
+    primes, roots, logs = base
+    needed = len(primes) + 1 + EXTRA_RELATIONS
+
+    full, partials, seen = [], {}, set()
+
+    def merge(family):
+        for u, factors, large in family[0]:
+            if u % n not in seen:
+                seen.add(u % n)
+                full.append((u, factors, 1))
+        for u, factors, large in family[1]:
+            if u % n in seen:
+                continue
+            seen.add(u % n)
+            if large not in partials:
+                partials[large] = (u, factors)
+                continue
+            # Two relations sharing the large prime L multiply to one with L^2
+            u0, factors0 = partials[large]
+            full.append((u0 * u, factors0 + factors, large))
+        if progress:
+            progress(len(full), needed)
+
+    initargs = (n, kn, primes, roots, logs, M)
+    seeds = iter(lambda: random.getrandbits(64), None)
+    executor = None
+    if workers != 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_siqs_worker, initargs=initargs)
+        in_flight = 2 * (workers or os.cpu_count())
+    else:
+        _init_siqs_worker(*initargs)
+    try:
+        while True:
+            if executor is None:
+                while len(full) < needed:
+                    merge(_sieve_family(next(seeds)))
+            else:
+                pending = {executor.submit(_sieve_family, next(seeds)) for _ in range(in_flight)}
+                while len(full) < needed:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        merge(future.result())
+                        pending.add(executor.submit(_sieve_family, next(seeds)))
+                for future in pending:
+                    future.cancel()
+
+            for subset in _square_subsets(full, len(primes) + 1):
+                factor = _split_from_subset(n, primes, full, subset)
+                if factor:
+                    return factor
+            needed = len(full) + EXTRA_RELATIONS  # Only trivial squares: sieve a little more
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    # Ví dụ: modulus 40 chữ số, quá lớn cho Pollard rho nhưng nhỏ với SIQS
+    p = 10000000000000000051
+    q = 10000000000000000087
+    n = p * q
+
+    print(f"🧪 SIQS attack on n = {n}")
+    d = siqs_factor(n, progress=lambda have, need: print(f"\r    relations {have}/{need}", end=""))
+    print()
+    if d:
+        print(f"✅ Found factor: d = {d}, n/d = {n // d}")
+    else:
+        print("❌ Attack failed.")
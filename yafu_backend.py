@@ -0,0 +1,362 @@
+"""Drive the bundled yafu binary for moduli too large for the Python engines.
+
+Jobs (siqs, nfs or the automatic factor) are queued on a YafuBackend,
+which runs at most max_concurrent yafu processes at a time.  Every job
+gets its own working directory, because yafu writes factor.log,
+session.log and its siqs/nfs checkpoint files into the current
+directory (yafu.ini goes with it, its ggnfs/ecm paths made absolute).
+Progress and results are read back from those logs, and an
+NFS (or factor) job whose directory already holds nfs.job/nfs.dat for the same n is
+restarted with -R instead of starting over.
+"""
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+YAFU_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "yafu-1.34")
+YAFU_BINARY = os.path.join(YAFU_DIR, "yafu-x64.exe" if sys.platform == "win32" else "yafu")
+METHODS = ("factor", "siqs", "nfs")
+NFS_CHECKPOINT_PATTERNS = ("nfs.job", "nfs.fb", "nfs.dat*")
+INI_PATH_KEYS = ("ggnfs_dir", "ecm_path")  # yafu.ini entries relative to the binary's directory
+
+LOG_LINE = re.compile(r"^(\d\d/\d\d/\d\d \d\d:\d\d:\d\d) v[\d.]+ @ [^,]*, (.*)$")
+START_LINE = re.compile(r"Starting factorization of (\d+)")
+NFS_START_LINE = re.compile(r"nfs: commencing nfs on c\d+: (\d+)")
+FACTOR_LINE = re.compile(r"^(prp|p|c|q)(\d+) = (\d+)", re.I)
+DIV_LINE = re.compile(r"div: found prime factor = (\d+)")
+TOTAL_TIME_LINE = re.compile(r"Total factoring time = ([\d.]+) seconds")
+EXPRESSION_LINE = re.compile(r"Processing expression: (.*)")
+
+# --- Log parsing ---
+
+def parse_factor_log(path):
+    """Split a factor.log into runs.
+
+    Each run is a dict with n, the factors found as (kind, value) where
+    kind is 'prp', 'p' or 'c', every (timestamp, message) event, the last
+    message as progress, and total_time once the run finished.
+    """
+    runs = []
+    current = None
+    if not os.path.exists(path):
+        return runs
+    with open(path, errors="replace") as f:
+        for line in f:
+            match = LOG_LINE.match(line.rstrip("\n"))
+            if not match:
+                continue
+            timestamp, message = match.groups()
+            # factor() logs "Starting factorization"; a bare nfs() call only logs the nfs start
+            start = START_LINE.search(message)
+            nfs_start = NFS_START_LINE.search(message)
+            if start or (nfs_start and (current is None or current["n"] != int(nfs_start.group(1)))):
+                n = int((start or nfs_start).group(1))
+                current = {"n": n, "factors": [], "events": [], "progress": None, "total_time": None}
+                runs.append(current)
+            if current is None or not message.strip("* "):
+                continue
+            current["events"].append((timestamp, message))
+            current["progress"] = message
+            factor = FACTOR_LINE.match(message)
+            if factor:
+                current["factors"].append((factor.group(1).lower(), int(factor.group(3))))
+            small_factor = DIV_LINE.search(message)
+            if small_factor:
+                current["factors"].append(("p", int(small_factor.group(1))))
+            total = TOTAL_TIME_LINE.search(message)
+            if total:
+                current["total_time"] = float(total.group(1))
+    return runs
+
+def parse_session_log(path):
+    """(timestamp, expression) for every expression yafu processed in session.log."""
+    expressions = []
+    if not os.path.exists(path):
+        return expressions
+    with open(path, errors="replace") as f:
+        for line in f:
+            match = LOG_LINE.match(line.rstrip("\n"))
+            if match:
+                expression = EXPRESSION_LINE.search(match.group(2))
+                if expression:
+                    expressions.append((match.group(1), expression.group(1)))
+    return expressions
+
+def job_ini(ini_path, base_dir):
+    """yafu.ini text with the relative tool paths made absolute (base_dir: the binary's directory)."""
+    lines = []
+    with open(ini_path, errors="replace") as f:
+        for line in f:
+            key, sep, value = line.rstrip("\r\n").partition("=")
+            if sep and key.strip() in INI_PATH_KEYS and value.strip() and not os.path.isabs(value.strip()):
+                value = value.strip()
+                trailing = os.sep if value.endswith(("/", "\\")) else ""  # yafu appends binary names
+                value = os.path.normpath(os.path.join(base_dir, value.replace("\\", os.sep))) + trailing
+                line = f"{key}={value}\n"
+            lines.append(line if line.endswith("\n") else line + "\n")
+    return "".join(lines)
+
+def nfs_checkpoint_n(workdir):
+    """The n an nfs.job in workdir belongs to, or None."""
+    job_path = os.path.join(workdir, "nfs.job")
+    if not os.path.exists(job_path):
+        return None
+    with open(job_path) as f:
+        for line in f:
+            if line.startswith("n:"):
+                return int(line.split(":", 1)[1].strip().strip('"'))
+    return None
+
+# --- Jobs ---
+
+class YafuJob:
+    """One yafu run; status goes queued -> running -> done | failed | cancelled.
+
+    error is set when yafu could not be started at all.
+    """
+
+    def __init__(self, job_id, n, method, workdir, timeout):
+        self.id = job_id
+        self.n = n
+        self.method = method
+        self.workdir = workdir
+        self.timeout = timeout
+        self.status = "queued"
+        self.factors = []
+        self.returncode = None
+        self.resumed = False
+        self.started_at = None
+        self.finished_at = None
+        self.stdout = ""
+        self.error = None
+        self._process = None
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def factor_log(self):
+        return os.path.join(self.workdir, "factor.log")
+
+    def progress(self):
+        """Latest factor.log message for this job's n (None before yafu logged anything)."""
+        runs = [run for run in parse_factor_log(self.factor_log) if run["n"] == self.n]
+        return runs[-1]["progress"] if runs else None
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns True if it did within timeout."""
+        return self._done.wait(timeout)
+
+    def __repr__(self):
+        return f"YafuJob(id={self.id}, method={self.method}, status={self.status}, factors={self.factors})"
+
+def _stdout_factors(stdout):
+    """Factors from yafu's '***factors found***' block (fallback when factor.log is missing)."""
+    factors = []
+    for line in stdout.splitlines():
+        match = FACTOR_LINE.match(line.strip())
+        if match:
+            factors.append((match.group(1).lower(), int(match.group(3))))
+    return factors
+
+class YafuBackend:
+    """Bounded-concurrency queue of yafu jobs, each in its own working directory."""
+
+    def __init__(self, jobs_dir="yafu_jobs", max_concurrent=1, threads=1, binary=YAFU_BINARY, ini_path=None):
+        self.jobs_dir = jobs_dir
+        self.threads = threads
+        self.binary = os.path.abspath(binary)
+        if not os.path.isfile(self.binary):
+            raise FileNotFoundError(f"yafu binary not found: {self.binary}")
+        if not os.access(self.binary, os.X_OK):
+            raise PermissionError(f"yafu binary is not executable: {self.binary} (chmod +x it)")
+        self.ini_path = ini_path or os.path.join(os.path.dirname(self.binary), "yafu.ini")
+        self._jobs = {}
+        self._ids = count(1)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def submit(self, n, method="factor", timeout=None, workdir=None, resume_from=None, extra_args=()):
+        """Queue a job and return its YafuJob.
+
+        workdir defaults to <jobs_dir>/job-<id>.  resume_from copies NFS
+        checkpoint files (nfs.job, nfs.fb, nfs.dat*) from another directory,
+        e.g. the yafu-1.34 directory of an interrupted manual run.
+        """
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}")
+        job_id = next(self._ids)
+        workdir = workdir or os.path.join(self.jobs_dir, f"job-{job_id}")
+        os.makedirs(workdir, exist_ok=True)
+        if resume_from:
+            for pattern in NFS_CHECKPOINT_PATTERNS:
+                for path in glob.glob(os.path.join(resume_from, pattern)):
+                    shutil.copy2(path, workdir)
+        job_ini_path = os.path.join(workdir, "yafu.ini")
+        if os.path.exists(self.ini_path) and not os.path.exists(job_ini_path):
+            # yafu reads the ini from its working directory, where relative ggnfs/ecm paths would break
+            with open(job_ini_path, "w") as f:
+                f.write(job_ini(self.ini_path, os.path.dirname(self.binary)))
+
+        job = YafuJob(job_id, n, method, os.path.abspath(workdir), timeout)
+        self._jobs[job_id] = job
+        self._executor.submit(self._run, job, tuple(extra_args))
+        return job
+
+    def _command(self, job, extra_args):
+        command = [self.binary, f"{job.method}({job.n})", "-threads", str(self.threads)]
+        if job.method in ("nfs", "factor") and nfs_checkpoint_n(job.workdir) == job.n:
+            job.resumed = True
+            command.append("-R")
+        return command + list(extra_args)
+
+    def _run(self, job, extra_args):
+        try:
+            self._execute(job, extra_args)
+        except Exception as err:
+            # Nothing reads the executor's future: report the error on the job instead
+            job.status = "failed"
+            job.error = job.error or f"{type(err).__name__}: {err}"
+            job.finished_at = time.time()
+        finally:
+            job._done.set()
+
+    def _execute(self, job, extra_args):
+        # The handle is set under the lock before the job counts as running, so cancel() always sees it
+        with job._lock:
+            if job._cancelled:
+                return
+            job.started_at = time.time()
+            try:
+                job._process = subprocess.Popen(self._command(job, extra_args), cwd=job.workdir,
+                                                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                                stderr=subprocess.STDOUT, text=True)
+            except OSError as err:
+                job.error = str(err)
+            job.status = "running"
+        if job._process is not None:
+            try:
+                job.stdout, _ = job._process.communicate(timeout=job.timeout)
+            except subprocess.TimeoutExpired:
+                job._process.kill()
+                job.stdout, _ = job._process.communicate()
+            job.returncode = job._process.returncode
+
+        runs = [run for run in parse_factor_log(job.factor_log) if run["n"] == job.n]
+        job.factors = runs[-1]["factors"] if runs and runs[-1]["factors"] else _stdout_factors(job.stdout)
+        if job._cancelled:
+            job.status = "cancelled"
+        elif job.returncode == 0 and job.factors:
+            job.status = "done"
+        else:
+            job.status = "failed"
+        job.finished_at = time.time()
+
+    def cancel(self, job):
+        """Stop a queued or running job; NFS checkpoints stay in its directory for a later resume."""
+        with job._lock:
+            job._cancelled = True
+            if job._process is not None and job._process.poll() is None:
+                job._process.terminate()
+            elif job.status == "queued":
+                job.status = "cancelled"
+
+    def job(self, job_id):
+        return self._jobs[job_id]
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def close(self, cancel=False):
+        if cancel:
+            for job in self._jobs.values():
+                if not job._done.is_set():
+                    self.cancel(job)
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close(cancel=exc_info[0] is not None)
+
+# --- Stub check ---
+
+STUB_YAFU = """#!{python}
+import math, sys, time
+method, n = sys.argv[1].rstrip(")").split("(")
+n = int(n)
+def log(message):
+    with open("factor.log", "a") as f:
+        f.write(time.strftime("%m/%d/%y %H:%M:%S") + " v1.34.5 @ stub, " + message + "\\n")
+log("Starting factorization of %d" % n)
+if n % 2 == 0:
+    log("div: found prime factor = 2")
+    time.sleep(60)  # Slow job, for cancel()
+p = next(d for d in range(3, math.isqrt(n) + 1, 2) if n % d == 0)
+for value in (p, n // p):
+    log("prp%d = %d" % (len(str(value)), value))
+log("Total factoring time = 0.0100 seconds")
+print("***factors found***")
+print("P%d = %d" % (len(str(p)), p))
+print("P%d = %d" % (len(str(n // p)), n // p))
+"""
+
+def _stub_check():
+    """Run the backend against a stub yafu: submit, completion, log parsing, the job ini and cancel."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as workdir:
+        binary = os.path.join(workdir, "yafu")
+        with open(binary, "w") as f:
+            f.write(STUB_YAFU.format(python=sys.executable))
+        try:
+            YafuBackend(os.path.join(workdir, "jobs"), binary=binary)
+            raise AssertionError("a non-executable binary was accepted")
+        except PermissionError:
+            pass
+        os.chmod(binary, 0o755)
+        with open(os.path.join(workdir, "yafu.ini"), "w") as f:
+            f.write("threads=1\nggnfs_dir=../ggnfs-bin/\n")
+
+        with YafuBackend(os.path.join(workdir, "jobs"), max_concurrent=2, binary=binary) as backend:
+            job = backend.submit(1000003 * 1000033, "siqs")
+            slow = backend.submit(2 * 1000003, "siqs")
+            assert job.wait(30) and job.status == "done", job
+            assert sorted(value for _, value in job.factors) == [1000003, 1000033]
+            runs = parse_factor_log(job.factor_log)
+            assert runs[-1]["n"] == job.n and runs[-1]["total_time"] == 0.01
+            with open(os.path.join(job.workdir, "yafu.ini")) as f:
+                ggnfs_dir = os.path.join(os.path.dirname(workdir), "ggnfs-bin") + os.sep
+                assert f"ggnfs_dir={ggnfs_dir}\n" in f.read(), "relative ggnfs_dir not made absolute"
+            while slow.progress() is None:
+                time.sleep(0.05)
+            backend.cancel(slow)
+            assert slow.wait(30) and slow.status == "cancelled", slow
+            assert slow.factors == [("p", 2)]  # Progress logged before the cancel is kept
+    print("Stub yafu check OK: submit, log parsing, job ini and cancel.")
+
+if __name__ == "__main__":
+    if "--stub" in sys.argv:
+        _stub_check()
+        sys.exit()
+
+    # Ví dụ: modulus lớn hơn tầm của Pollard rho, để yafu (SIQS) xử lý
+    n = 1000000000000000000000000000057 * 100000000000000000000000000000049
+
+    print(f"🧪 yafu siqs on n = {n}")
+    with YafuBackend() as backend:
+        job = backend.submit(n, "siqs")
+        while not job.wait(5):
+            print(f"    ... {job.progress()}")
+    if job.status == "done":
+        print(f"✅ Factors: {[value for _, value in job.factors]}")
+    else:
+        print(f"❌ yafu job {job.status} (return code {job.returncode})")